@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-item serialization cost of the user list endpoint.
+
+Compares the response_model path (ORM objects validated through
+schemas.User, then dumped to JSON) against the row-tuple path used for
+flat fieldsets (plain dicts rendered with orjson).
+
+Usage:
+    python benchmarks/bench_serialization.py --items 1000 --repeat 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+# Models import the database module, which only needs a URL to build an engine
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import orjson
+from pydantic import TypeAdapter
+from typing import List
+from src.rbac_version_2 import models, schemas
+from src.rbac_version_2.fieldsets import USER_FIELDS
+from src.rbac_version_2.responses import ORJSONResponse
+
+
+def build_users(count: int, permissions_per_role: int) -> List[models.User]:
+    now = datetime.now(timezone.utc)
+    organization = models.Organization(id=1, name="Benchmark Org", created_at=now, permissions_version=0)
+    permissions = [
+        models.Permission(id=i, name=f"permission_{i}", description=f"Permission number {i}")
+        for i in range(permissions_per_role)
+    ]
+    role = models.Role(
+        id=1, name="member", organization_id=1, created_at=now, permissions_version=0, permissions=permissions
+    )
+    return [
+        models.User(
+            id=i, first_name=f"First{i}", last_name=f"Last{i}", email=f"user{i}@example.com",
+            organization_id=1, role_id=1, is_email_verified=True, created_at=now,
+            organization=organization, role=role, hashed_password="x"
+        )
+        for i in range(count)
+    ]
+
+
+def time_per_item(func, items: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best / items * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--permissions", type=int, default=8, help="permissions per role")
+    args = parser.parse_args()
+
+    users = build_users(args.items, args.permissions)
+    rows = [tuple(getattr(user, field) for field in USER_FIELDS) for user in users]
+    full_adapter = TypeAdapter(List[schemas.User])
+    sparse_adapter = TypeAdapter(List[schemas.UserSparse])
+
+    def response_model_full():
+        data = full_adapter.validate_python(users, from_attributes=True)
+        return json.dumps(full_adapter.dump_python(data, mode="json")).encode()
+
+    def response_model_full_pydantic_json():
+        data = full_adapter.validate_python(users, from_attributes=True)
+        return full_adapter.dump_json(data)
+
+    def response_model_flat():
+        shaped = [{field: getattr(user, field) for field in USER_FIELDS} for user in users]
+        data = sparse_adapter.validate_python(shaped, from_attributes=True)
+        return sparse_adapter.dump_json(data, exclude_unset=True)
+
+    def row_tuples_orjson():
+        return ORJSONResponse([dict(zip(USER_FIELDS, row)) for row in rows]).body
+
+    cases = [
+        ("full schemas.User + stdlib json", response_model_full),
+        ("full schemas.User + pydantic json", response_model_full_pydantic_json),
+        ("flat UserSparse + pydantic json", response_model_flat),
+        ("flat row tuples + orjson", row_tuples_orjson),
+    ]
+    baseline = None
+    print(f"{args.items} users, {args.permissions} permissions per role, best of {args.repeat}\n")
+    print(f"{'path':40} {'us/item':>10} {'bytes/item':>11} {'speedup':>8}")
+    for name, func in cases:
+        per_item = time_per_item(func, args.items, args.repeat)
+        size = len(func()) / args.items
+        baseline = baseline or per_item
+        print(f"{name:40} {per_item:10.2f} {size:11.0f} {baseline / per_item:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
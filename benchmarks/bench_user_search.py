@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET /users/search (crud.search_users) against a large seeded table.
+
+Seeds --users synthetic users spread over --organizations tenants, with the
+first tenant holding --largest-share of all rows, then times prefix searches
+within the largest tenant. Run it against a scratch database: the tables are
+created if missing and the seeded rows are left in place for re-runs
+(pass --skip-seed).
+
+Usage:
+    python benchmarks/bench_user_search.py --database-url postgresql://localhost/rbac_bench --users 3000000
+    python benchmarks/bench_user_search.py --database-url postgresql://localhost/rbac_bench --skip-seed --explain
+"""
+
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--database-url", required=True, help="scratch database to seed and query")
+parser.add_argument("--users", type=int, default=2_000_000)
+parser.add_argument("--organizations", type=int, default=100)
+parser.add_argument("--largest-share", type=float, default=0.3, help="fraction of users in the largest tenant")
+parser.add_argument("--queries", type=int, default=200)
+parser.add_argument("--limit", type=int, default=20)
+parser.add_argument("--batch-size", type=int, default=10000)
+parser.add_argument("--seed", type=int, default=42)
+parser.add_argument("--skip-seed", action="store_true")
+parser.add_argument("--explain", action="store_true", help="print the PostgreSQL plan for one query")
+args = parser.parse_args()
+
+# The application modules build their engine from DATABASE_URL at import time
+os.environ["DATABASE_URL"] = args.database_url
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import event, func, insert, text
+from src.rbac_version_2 import crud, models
+from src.rbac_version_2.database import Base, SessionLocal, engine
+
+SYLLABLES = ["an", "bel", "car", "da", "el", "fin", "gar", "han", "is", "jo", "ka", "lin",
+             "mar", "nor", "ol", "per", "quin", "ros", "sam", "tor", "ul", "val", "wen", "zed"]
+
+
+def make_name(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+
+
+def seed(rng: random.Random) -> int:
+    """Insert organizations, one role per organization and the users; returns the largest tenant's id"""
+    db = SessionLocal()
+    try:
+        organizations = [models.Organization(name=f"bench-org-{i}") for i in range(args.organizations)]
+        db.add_all(organizations)
+        db.flush()
+        roles = [models.Role(name="user", organization_id=organization.id) for organization in organizations]
+        db.add_all(roles)
+        db.commit()
+        role_of = {role.organization_id: role.id for role in roles}
+        organization_ids = [organization.id for organization in organizations]
+    finally:
+        db.close()
+
+    largest = organization_ids[0]
+    use_copy = engine.dialect.name == "postgresql"
+    start = time.perf_counter()
+    for batch_start in range(0, args.users, args.batch_size):
+        rows = []
+        for i in range(batch_start, min(batch_start + args.batch_size, args.users)):
+            organization_id = largest if rng.random() < args.largest_share else rng.choice(organization_ids)
+            first_name, last_name = make_name(rng), make_name(rng)
+            rows.append((organization_id, first_name, last_name,
+                         f"{first_name.lower()}.{last_name.lower()}.{i}@example.com",
+                         "x", role_of[organization_id], True))
+        if use_copy:
+            _copy_users(rows)
+        else:
+            with engine.begin() as connection:
+                connection.execute(insert(models.User), [
+                    dict(zip(("organization_id", "first_name", "last_name", "email",
+                              "hashed_password", "role_id", "is_email_verified"), row))
+                    for row in rows
+                ])
+        done = min(batch_start + args.batch_size, args.users)
+        print(f"\r  seeded {done:,}/{args.users:,} users", end="", flush=True)
+    print(f"\n  seeding took {time.perf_counter() - start:.1f}s")
+    if use_copy:
+        with engine.begin() as connection:
+            connection.execute(text("ANALYZE rbac_users"))
+    return largest
+
+
+def _copy_users(rows) -> None:
+    buffer = io.StringIO("".join("\t".join(str(value) for value in row) + "\n" for row in rows))
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                "COPY rbac_users (organization_id, first_name, last_name, email, hashed_password, role_id, "
+                "is_email_verified) FROM STDIN", buffer
+            )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def explain(db, organization_id: int, query_text: str) -> None:
+    """Print the plan of the exact statement crud.search_users runs"""
+    captured = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        crud.search_users(db, organization_id, query_text, limit=args.limit)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    statement, parameters = captured[-1]
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN ANALYZE " + statement, parameters)
+            print(f"EXPLAIN ANALYZE for q={query_text!r}:")
+            for (line,) in cursor.fetchall():
+                print(f"  {line}")
+    finally:
+        connection.close()
+
+
+def largest_organization() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(models.User.organization_id).group_by(models.User.organization_id).order_by(
+            func.count().desc()
+        ).limit(1).scalar()
+    finally:
+        db.close()
+
+
+def main() -> None:
+    rng = random.Random(args.seed)
+    Base.metadata.create_all(bind=engine)
+    organization_id = largest_organization() if args.skip_seed else seed(rng)
+    if organization_id is None:
+        raise SystemExit("❌ No users found; run without --skip-seed first")
+
+    # Prefixes of one to three syllables, plus "first last" pairs
+    queries = []
+    for _ in range(args.queries):
+        kind = rng.random()
+        if kind < 0.4:
+            queries.append("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))))
+        elif kind < 0.8:
+            queries.append(f"{make_name(rng)} {rng.choice(SYLLABLES)}".lower())
+        else:
+            queries.append(f"{make_name(rng).lower()}.")
+
+    db = SessionLocal()
+    try:
+        if args.explain and engine.dialect.name == "postgresql":
+            explain(db, organization_id, queries[0])
+
+        timings, pages = [], 0
+        for query_text in queries:
+            start = time.perf_counter()
+            items, next_cursor = crud.search_users(db, organization_id, query_text, limit=args.limit)
+            if next_cursor:
+                crud.search_users(db, organization_id, query_text, limit=args.limit, cursor=next_cursor)
+                pages += 1
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        db.close()
+
+    timings.sort()
+    print(f"{len(timings)} searches in organization {organization_id} ({pages} with a second page):")
+    print(f"  p50 {statistics.median(timings):8.2f} ms")
+    print(f"  p95 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms")
+    print(f"  p99 {timings[int(len(timings) * 0.99) - 1]:8.2f} ms")
+    print(f"  max {timings[-1]:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Buffered, append-only audit trail.
+
+Events are recorded in memory and written to audit_log in batches by a
+background task, so auditing adds no database round trip to the request
+path. The buffer is bounded; when it is full the overflow policy decides
+whether the oldest buffered event or the new one is dropped, and drops are
+counted in the metrics.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from .config import settings
+from .database import SessionLocal
+from .models import AuditEvent
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+
+# The authenticated principal of the current request, set by auth.get_current_principal
+current_actor: ContextVar[Optional[Any]] = ContextVar("audit_actor", default=None)
+
+
+class AuditMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.batches = 0
+        self.flush_failures = 0
+        self.total_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.max_event_age_seconds = 0.0
+
+    def incr(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def record_flush(self, count: int, seconds: float, oldest_age: float) -> None:
+        with self._lock:
+            self.flushed += count
+            self.batches += 1
+            self.total_flush_seconds += seconds
+            self.max_flush_seconds = max(self.max_flush_seconds, seconds)
+            self.max_event_age_seconds = max(self.max_event_age_seconds, oldest_age)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "recorded": self.recorded,
+                "dropped": self.dropped,
+                "flushed": self.flushed,
+                "batches": self.batches,
+                "flush_failures": self.flush_failures,
+                "avg_flush_ms": round(self.total_flush_seconds * 1000 / self.batches, 3) if self.batches else 0.0,
+                "max_flush_ms": round(self.max_flush_seconds * 1000, 3),
+                "max_event_age_ms": round(self.max_event_age_seconds * 1000, 3),
+            }
+
+
+class AuditLog:
+    def __init__(self, session_factory: Callable[[], Session], buffer_size: int,
+                 overflow_policy: str, batch_size: int, enabled: bool = True):
+        if overflow_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown audit overflow policy: {overflow_policy}")
+        self.session_factory = session_factory
+        self.buffer_size = buffer_size
+        self.overflow_policy = overflow_policy
+        self.batch_size = batch_size
+        self.enabled = enabled
+        self.metrics = AuditMetrics()
+        self._buffer: deque = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def record(self, action: str, target_type: Optional[str] = None, target_id: Optional[int] = None,
+               organization_id: Optional[int] = None, **detail: Any) -> None:
+        """Buffer an event attributed to the current request's principal (if any)"""
+        if not self.enabled:
+            return
+        actor = current_actor.get()
+        event = {
+            "occurred_at": datetime.now(timezone.utc),
+            "actor_id": actor.id if actor else None,
+            "actor_email": actor.email if actor else None,
+            "organization_id": organization_id if organization_id is not None else (
+                actor.organization_id if actor else None
+            ),
+            "action": action,
+            "target_type": target_type,
+            "target_id": target_id,
+            "detail": json.dumps(detail, default=str) if detail else None,
+        }
+        with self._lock:
+            if len(self._buffer) >= self.buffer_size:
+                self.metrics.incr("dropped")
+                if self.overflow_policy == DROP_NEWEST:
+                    return
+                self._buffer.popleft()
+            self._buffer.append(event)
+            full_batch = len(self._buffer) >= self.batch_size
+        self.metrics.incr("recorded")
+        if full_batch:
+            self._wake()
+
+    def _wake(self) -> None:
+        if self._loop is not None and self._wakeup is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass
+
+    def _take_batch(self) -> List[dict]:
+        with self._lock:
+            return [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+
+    def _requeue(self, batch: List[dict]) -> None:
+        """Put a failed batch back at the front, as far as the buffer bound allows"""
+        with self._lock:
+            room = self.buffer_size - len(self._buffer)
+            kept = batch[:max(room, 0)]
+            self._buffer.extendleft(reversed(kept))
+        if len(kept) < len(batch):
+            self.metrics.incr("dropped", len(batch) - len(kept))
+
+    def flush(self) -> int:
+        """Write buffered events in multi-row INSERTs, returning the number written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    return written
+                start = time.perf_counter()
+                db = self.session_factory()
+                try:
+                    db.execute(insert(AuditEvent).values(batch))
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    self.metrics.incr("flush_failures")
+                    self._requeue(batch)
+                    print(f"⚠️  Warning: Audit flush failed, {len(batch)} events requeued: {e}")
+                    return written
+                finally:
+                    db.close()
+                oldest_age = (datetime.now(timezone.utc) - batch[0]["occurred_at"]).total_seconds()
+                self.metrics.record_flush(len(batch), time.perf_counter() - start, oldest_age)
+                written += len(batch)
+
+    async def run_flusher(self, interval: float = settings.audit_flush_interval_seconds) -> None:
+        """Flush every interval, or sooner once a full batch is buffered"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                try:
+                    await run_in_threadpool(self.flush)
+                except Exception as e:
+                    print(f"⚠️  Warning: Audit flush failed: {e}")
+        finally:
+            self._loop = None
+            self._wakeup = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buffered = len(self._buffer)
+        return dict(self.metrics.snapshot(), buffered=buffered, buffer_size=self.buffer_size)
+
+
+audit_log = AuditLog(
+    SessionLocal,
+    buffer_size=settings.audit_buffer_size,
+    overflow_policy=settings.audit_overflow_policy,
+    batch_size=settings.audit_batch_size,
+    enabled=settings.audit_enabled,
+)
+
+
+def record_decision(decision, **detail: Any) -> None:
+    """Audit an authorization decision according to AUDIT_AUTHORIZATION_DECISIONS"""
+    mode = settings.audit_authorization_decisions
+    if mode == "none" or (mode == "denied" and decision.allowed):
+        return
+    audit_log.record(
+        "authorization.granted" if decision.allowed else "authorization.denied",
+        permissions=list(decision.required), mode=decision.mode, missing=list(decision.missing), **detail
+    )
@@ -1,21 +1,45 @@
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from .config import settings
-from .database import get_db
+from .database import SessionLocal, get_db
 from .models import User
 from .email_service import email_service
+from .cache import authorization_cache
+from .singleflight import SingleFlight
+from .password_calibration import resolve_rounds
+from . import token_store, schemas, audit, signing_keys
+
+def build_password_context(scheme: str, rounds: Optional[int] = None) -> CryptContext:
+    """
+    Build a CryptContext for the configured scheme and cost (the scheme's default when
+    unset). Hashes made with another scheme or cost report needs_update, so they are
+    upgraded on the next login.
+    """
+    rounds = resolve_rounds(scheme, rounds)
+    schemes = [scheme] if scheme == "bcrypt" else [scheme, "bcrypt"]
+    cost = {} if rounds is None else {
+        f"{scheme}__default_rounds": rounds,
+        f"{scheme}__min_rounds": rounds,
+        f"{scheme}__max_rounds": rounds,
+    }
+    return CryptContext(schemes=schemes, deprecated="auto", **cost)
+
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = build_password_context(settings.password_hash_scheme, settings.password_hash_rounds)
 
 # JWT token security
 security = HTTPBearer()
 
+# Concurrent cache misses for the same email share one query
+principal_flight = SingleFlight("principal", settings.singleflight_timeout_seconds)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -32,8 +56,13 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     user = db.query(User).filter(User.email == email).first()
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = pwd_context.verify_and_update(password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        # Transparently move the stored hash to the configured scheme and cost
+        user.hashed_password = new_hash
+        db.commit()
     return user
 
 
@@ -45,50 +74,174 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     
+    to_encode.setdefault("jti", token_store.new_jti())
     to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
-    return encoded_jwt
+    return encode_token(to_encode)
 
 
 def create_refresh_token(data: dict):
     """Create a JWT refresh token"""
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
+    to_encode.setdefault("jti", token_store.new_jti())
     to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
-    return encoded_jwt
+    return encode_token(to_encode)
 
 
-def verify_token(token: str) -> Optional[str]:
-    """Verify and decode a JWT token"""
+def issue_token_pair(db: Session, user: User, family_id: Optional[str] = None, refresh_jti: Optional[str] = None) -> dict:
+    """Create an access/refresh token pair and track the refresh token in the store"""
+    if family_id is None:
+        family_id = token_store.new_jti()
+    if refresh_jti is None:
+        refresh_jti = token_store.new_jti()
+        token_store.store_refresh_token(
+            db, user.id, refresh_jti, family_id,
+            datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days)
+        )
+    db.commit()
+
+    access_token = create_access_token(
+        data={"sub": user.email, "fid": family_id},
+        expires_delta=timedelta(minutes=settings.access_token_expire_minutes)
+    )
+    refresh_token = create_refresh_token(data={"sub": user.email, "jti": refresh_jti, "fid": family_id})
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token
+    }
+
+
+def rotate_tokens(db: Session, refresh_payload: dict, user: User) -> dict:
+    """Exchange a refresh token for a new pair, invalidating the presented one"""
+    new_refresh_jti = token_store.new_jti()
+    token_store.rotate_refresh_token(
+        db, refresh_payload.get("jti"), new_refresh_jti,
+        datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days)
+    )
+    return issue_token_pair(db, user, family_id=refresh_payload.get("fid"), refresh_jti=new_refresh_jti)
+
+
+def revoke_tokens(db: Session, access_payload: dict, refresh_payload: Optional[dict] = None) -> None:
+    """Revoke an access token and, if given, the refresh token family it belongs to"""
+    token_store.revoke_token_id(
+        db, access_payload["jti"], datetime.fromtimestamp(access_payload["exp"], tz=timezone.utc)
+    )
+    if refresh_payload and refresh_payload.get("fid"):
+        token_store.revoke_refresh_family(db, refresh_payload["fid"])
+    db.commit()
+
+
+def encode_token(claims: dict) -> str:
+    """Sign claims with the active key pair, or the shared secret for HS algorithms"""
+    if signing_keys.asymmetric_signing():
+        return signing_keys.get_keyring().sign(claims)
+    return jwt.encode(claims, settings.secret_key, algorithm=settings.algorithm)
+
+
+def decode_token(token: str) -> Optional[dict]:
+    """Decode a JWT token, returning its claims or None if it is invalid"""
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        return email
+        if not signing_keys.asymmetric_signing():
+            return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        if settings.jwt_accept_hs256 and jwt.get_unverified_header(token).get("alg") == "HS256":
+            # Tokens issued before the switch to key pairs, until they expire
+            return jwt.decode(token, settings.secret_key, algorithms=["HS256"])
+        return signing_keys.get_keyring().verify(token)
     except JWTError:
         return None
 
 
-def verify_refresh_token(token: str) -> Optional[str]:
-    """Verify and decode a JWT refresh token"""
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        email: str = payload.get("sub")
-        token_type: str = payload.get("type")
-        if email is None or token_type != "refresh":
-            return None
-        return email
-    except JWTError:
+def verify_token(token: str) -> Optional[str]:
+    """Verify and decode a JWT token"""
+    payload = decode_token(token)
+    if payload is None:
         return None
+    return payload.get("sub")
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user"""
+def verify_refresh_token(token: str) -> Optional[dict]:
+    """Verify and decode a JWT refresh token, returning its claims"""
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    if payload.get("sub") is None or payload.get("type") != "refresh" or payload.get("jti") is None:
+        return None
+    return payload
+
+
+def _cached_principal(email: str) -> Tuple[bool, Optional[schemas.Principal]]:
+    found, cached = authorization_cache.get(authorization_cache.PRINCIPAL, email)
+    return found, (schemas.Principal(**cached) if found and cached else None)
+
+
+def _query_principal(email: str) -> Optional[schemas.Principal]:
+    # Always the primary: a lagging replica would cache a revoked role for the full TTL
+    generation = authorization_cache.generation(authorization_cache.PRINCIPAL)
+    db = SessionLocal()
+    try:
+        row = db.query(
+            User.id, User.email, User.organization_id, User.role_id, User.is_email_verified
+        ).filter(User.email == email).first()
+    finally:
+        db.close()
+    principal = schemas.Principal(**row._asdict()) if row else None
+    authorization_cache.set(
+        authorization_cache.PRINCIPAL, email, principal.model_dump() if principal else None, generation=generation
+    )
+    return principal
+
+
+def load_principal(email: str) -> Optional[schemas.Principal]:
+    """Load the authorization-relevant columns of a user from the cache or the primary"""
+    found, principal = _cached_principal(email)
+    if found:
+        return principal
+    return principal_flight.do(email, lambda: _query_principal(email))
+
+
+async def load_principal_async(email: str) -> Optional[schemas.Principal]:
+    """load_principal for coroutines: a cache miss is queried in the threadpool, coalesced per email"""
+    found, principal = _cached_principal(email)
+    if found:
+        return principal
+    return await principal_flight.do_async(email, lambda: run_in_threadpool(_query_principal, email))
+
+
+def load_principals(emails: Iterable[str]) -> Dict[str, Optional[schemas.Principal]]:
+    """Batch load_principal: cached entries first, then one query on the primary for the rest"""
+    principals: Dict[str, Optional[schemas.Principal]] = {}
+    missing = []
+    for email in set(emails):
+        found, cached = authorization_cache.get(authorization_cache.PRINCIPAL, email)
+        if found:
+            principals[email] = schemas.Principal(**cached) if cached else None
+        else:
+            missing.append(email)
+    
+    if missing:
+        generation = authorization_cache.generation(authorization_cache.PRINCIPAL)
+        db = SessionLocal()
+        try:
+            rows = db.query(
+                User.id, User.email, User.organization_id, User.role_id, User.is_email_verified
+            ).filter(User.email.in_(missing)).all()
+        finally:
+            db.close()
+        loaded = {row.email: schemas.Principal(**row._asdict()) for row in rows}
+        for email in missing:
+            principals[email] = loaded.get(email)
+            authorization_cache.set(
+                authorization_cache.PRINCIPAL, email, principals[email].model_dump() if principals[email] else None,
+                generation=generation
+            )
+    return principals
+
+
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> schemas.Principal:
+    """Get the current authenticated principal without loading the full user graph"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -96,21 +249,43 @@ async def get_current_user(
     )
     
     token = credentials.credentials
-    email = verify_token(token)
+    payload = decode_token(token)
+    if payload is None or payload.get("type") == "refresh":
+        raise credentials_exception
+    email = payload.get("sub")
     if email is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+    if token_store.revocation_list.is_revoked(payload.get("jti"), payload.get("fid")):
+        raise credentials_exception
+    
+    principal = await load_principal_async(email)
+    if principal is None:
         raise credentials_exception
     
     # Check if email is verified
-    if not user.is_email_verified:
+    if not principal.is_email_verified:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Email not verified. Please verify your email first."
         )
     
+    audit.current_actor.set(principal)
+    return principal
+
+
+async def get_current_user(
+    principal: schemas.Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get the current authenticated user"""
+    user = db.get(User, principal.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 
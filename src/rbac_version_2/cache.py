@@ -0,0 +1,207 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from .config import settings
+
+# Stored in place of a value to remember that a lookup found nothing
+_NEGATIVE = "__none__"
+
+
+class CacheBackend(ABC):
+    """Minimal string key/value interface shared by all cache backends"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """The value stored under key, or None if it is missing or expired"""
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: float) -> None:
+        """Store value under key for ttl seconds"""
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None:
+        """Remove keys; missing keys are ignored"""
+
+
+class InMemoryLRUCache(CacheBackend):
+    """Per-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class RedisCache(CacheBackend):
+    """Shared cache for any server speaking the Redis protocol"""
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("The redis cache backend requires the 'redis' package (pip install redis)") from e
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self._client.set(key, value, px=max(1, int(ttl * 1000)))
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self._client.delete(*keys)
+
+
+class CacheMetrics:
+    def __init__(self):
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, namespace: str, counter: str) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(
+                namespace, {"hits": 0, "negative_hits": 0, "misses": 0, "sets": 0, "stale_sets": 0, "invalidations": 0, "errors": 0}
+            )
+            counters[counter] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for namespace, counters in self._counters.items():
+                lookups = counters["hits"] + counters["negative_hits"] + counters["misses"]
+                hit_ratio = (counters["hits"] + counters["negative_hits"]) / lookups if lookups else 0.0
+                result[namespace] = dict(counters, hit_ratio=round(hit_ratio, 4))
+            return result
+
+
+class AuthorizationCache:
+    """
+    Typed cache for principals and role grant sets.
+    Each entry type has its own TTL; missing principals are cached briefly
+    so unknown or deleted accounts don't hit the database on every request.
+    Backend failures are counted and treated as misses. Every invalidation
+    bumps its namespace's generation; a load that read the database before
+    an invalidation passes the generation it started with and its stale
+    result is not written back.
+    """
+
+    PRINCIPAL = "principal"
+    GRANTS = "grants"
+
+    def __init__(self, backend: CacheBackend, ttls: Dict[str, float], negative_ttl: float, prefix: str = ""):
+        self.backend = backend
+        self.ttls = ttls
+        self.negative_ttl = negative_ttl
+        self.prefix = prefix
+        self.metrics = CacheMetrics()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}{namespace}:{key}"
+
+    def get(self, namespace: str, key: str) -> Tuple[bool, Any]:
+        """Return (found, value); a cached negative entry is found with value None"""
+        try:
+            raw = self.backend.get(self._key(namespace, key))
+        except Exception as e:
+            print(f"⚠️  Warning: Cache read failed: {e}")
+            self.metrics.incr(namespace, "errors")
+            return False, None
+        if raw is None:
+            self.metrics.incr(namespace, "misses")
+            return False, None
+        if raw == _NEGATIVE:
+            self.metrics.incr(namespace, "negative_hits")
+            return True, None
+        self.metrics.incr(namespace, "hits")
+        return True, json.loads(raw)
+
+    def generation(self, namespace: str) -> int:
+        """Take before reading the database; pass to set() to drop the write if an invalidation ran since"""
+        return self._generations.get(namespace, 0)
+
+    def set(self, namespace: str, key: str, value: Any, generation: Optional[int] = None) -> None:
+        """Cache a JSON-serializable value; None is stored as a negative entry"""
+        if generation is not None and generation != self.generation(namespace):
+            self.metrics.incr(namespace, "stale_sets")
+            return
+        if value is None:
+            raw, ttl = _NEGATIVE, self.negative_ttl
+        else:
+            raw, ttl = json.dumps(value, default=str), self.ttls[namespace]
+        try:
+            self.backend.set(self._key(namespace, key), raw, ttl)
+            self.metrics.incr(namespace, "sets")
+        except Exception as e:
+            print(f"⚠️  Warning: Cache write failed: {e}")
+            self.metrics.incr(namespace, "errors")
+
+    def invalidate(self, namespace: str, keys: Iterable[Any]) -> None:
+        keys = [self._key(namespace, str(key)) for key in keys if key is not None]
+        if not keys:
+            return
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        try:
+            self.backend.delete(*keys)
+            self.metrics.incr(namespace, "invalidations")
+        except Exception as e:
+            print(f"⚠️  Warning: Cache invalidation failed: {e}")
+            self.metrics.incr(namespace, "errors")
+
+    def invalidate_principals(self, *emails: Optional[str]) -> None:
+        self.invalidate(self.PRINCIPAL, emails)
+
+    def invalidate_roles(self, *role_ids: Optional[int]) -> None:
+        self.invalidate(self.GRANTS, role_ids)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return self.metrics.snapshot()
+
+
+def create_cache_backend() -> CacheBackend:
+    if settings.cache_backend == "redis":
+        return RedisCache(settings.cache_redis_url)
+    if settings.cache_backend == "memory":
+        return InMemoryLRUCache(settings.cache_max_entries)
+    raise ValueError(f"Unknown cache backend: {settings.cache_backend}")
+
+
+authorization_cache = AuthorizationCache(
+    create_cache_backend(),
+    ttls={
+        AuthorizationCache.PRINCIPAL: settings.cache_principal_ttl_seconds,
+        AuthorizationCache.GRANTS: settings.cache_grants_ttl_seconds,
+    },
+    negative_ttl=settings.cache_negative_ttl_seconds,
+    prefix=settings.cache_key_prefix,
+)
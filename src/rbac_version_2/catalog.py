@@ -0,0 +1,129 @@
+import hashlib
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .config import settings
+from .database import SessionLocal, USE_REPLICA
+from .models import CatalogVersion
+
+GLOBAL_SCOPE = "global"
+
+
+def organization_scope(organization_id: int) -> str:
+    return f"organization:{organization_id}"
+
+
+def read_versions(db: Session, scopes: Iterable[str]) -> Dict[str, int]:
+    """Read catalog versions through the given session, bypassing the cache"""
+    scopes = list(scopes)
+    rows = dict(
+        db.query(CatalogVersion.scope, CatalogVersion.version)
+        .filter(CatalogVersion.scope.in_(scopes))
+        .all()
+    )
+    return {scope: rows.get(scope, 0) for scope in scopes}
+
+
+class CatalogVersionCache:
+    """
+    Short-lived in-process copy of catalog_versions. Entries are dropped as soon
+    as a local transaction that bumped them commits; changes made by other
+    workers become visible within the TTL.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scopes: Iterable[str]) -> Dict[str, int]:
+        scopes = list(scopes)
+        now = time.monotonic()
+        versions = {}
+        missing = []
+        for scope in scopes:
+            entry = self._entries.get(scope)
+            if entry and now - entry[1] < self.ttl:
+                versions[scope] = entry[0]
+            else:
+                missing.append(scope)
+
+        if missing:
+            db = SessionLocal()
+            try:
+                rows = read_versions(db, missing)
+            finally:
+                db.close()
+            with self._lock:
+                for scope in missing:
+                    versions[scope] = rows.get(scope, 0)
+                    self._entries[scope] = (versions[scope], now)
+        return versions
+
+    def invalidate(self, scopes: Iterable[str]) -> None:
+        with self._lock:
+            for scope in scopes:
+                self._entries.pop(scope, None)
+
+
+version_cache = CatalogVersionCache(settings.catalog_version_cache_seconds)
+
+
+def bump_versions(db: Session, *scopes: str) -> None:
+    """Increment catalog versions inside the caller's transaction (caller commits)"""
+    for scope in set(scopes):
+        updated = db.query(CatalogVersion).filter(CatalogVersion.scope == scope).update(
+            {CatalogVersion.version: CatalogVersion.version + 1}, synchronize_session=False
+        )
+        if not updated:
+            try:
+                with db.begin_nested():
+                    db.add(CatalogVersion(scope=scope, version=1))
+            except IntegrityError:
+                # Another transaction created the row first
+                db.query(CatalogVersion).filter(CatalogVersion.scope == scope).update(
+                    {CatalogVersion.version: CatalogVersion.version + 1}, synchronize_session=False
+                )
+        db.info.setdefault("bumped_catalog_scopes", set()).add(scope)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_scopes(session: Session) -> None:
+    scopes = session.info.pop("bumped_catalog_scopes", None)
+    if scopes:
+        version_cache.invalidate(scopes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_scopes(session: Session) -> None:
+    session.info.pop("bumped_catalog_scopes", None)
+
+
+def make_etag(name: str, scopes: Iterable[str], *variant: Optional[object], db: Optional[Session] = None) -> str:
+    """
+    Build a strong ETag from the current catalog versions and the request variant.
+    Pass the session the body is read through: when it is routed to a replica the
+    versions are read there too, so a lagging replica never pairs a new ETag with
+    an old body.
+    """
+    if db is not None and db.info.get(USE_REPLICA):
+        versions = read_versions(db, scopes)
+    else:
+        versions = version_cache.get(scopes)
+    parts = [f"{scope}={version}" for scope, version in sorted(versions.items())]
+    parts += [str(value) for value in variant]
+    digest = hashlib.sha1(";".join(parts).encode()).hexdigest()[:20]
+    return f'"{name}-{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check an If-None-Match header against the current ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
@@ -1,18 +1,48 @@
+import base64
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, case, func, or_
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
-from typing import List, Optional
-from datetime import datetime, timedelta, timezone
-from . import models, schemas
+from typing import List, Optional, Sequence, Tuple
+from . import models, schemas, one_time_codes, catalog, events, jobs, teardown
+from .tenancy import scope_query
+from .cache import authorization_cache
+from .audit import audit_log
+from .policy import policy_engine
 from .auth import get_password_hash, verify_password
 from .email_service import email_service
 
 
+def _invalidate_roles(*role_ids: int) -> None:
+    """Drop cached grants for changed roles (call after commit)"""
+    authorization_cache.invalidate_roles(*role_ids)
+    policy_engine.invalidate_roles(*role_ids)
+
+
+def _bump_permissions_versions(db: Session, role_ids: Sequence[int], organization_ids: Sequence[int]) -> None:
+    """Increment permissions_version in the database inside the caller's transaction (caller commits)"""
+    # SET version = version + 1 is atomic, so concurrent changes never lose an increment
+    if role_ids:
+        db.query(models.Role).filter(models.Role.id.in_(set(role_ids))).update(
+            {models.Role.permissions_version: models.Role.permissions_version + 1}, synchronize_session=False
+        )
+    if organization_ids:
+        db.query(models.Organization).filter(models.Organization.id.in_(set(organization_ids))).update(
+            {models.Organization.permissions_version: models.Organization.permissions_version + 1},
+            synchronize_session=False
+        )
+
+
 # Organization CRUD operations
 def create_organization(db: Session, organization: schemas.OrganizationCreate) -> models.Organization:
     db_organization = models.Organization(**organization.model_dump())
     db.add(db_organization)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Organization already exists")
     db.refresh(db_organization)
     return db_organization
 
@@ -25,8 +55,13 @@ def get_organization_by_name(db: Session, name: str) -> Optional[models.Organiza
     return db.query(models.Organization).filter(models.Organization.name == name).first()
 
 
-def get_organizations(db: Session, skip: int = 0, limit: int = 100) -> List[models.Organization]:
-    return db.query(models.Organization).offset(skip).limit(limit).all()
+def get_organizations(
+    db: Session, skip: int = 0, limit: int = 100, organization_id: Optional[int] = None
+) -> List[models.Organization]:
+    query = db.query(models.Organization)
+    if organization_id is not None:
+        query = query.filter(models.Organization.id == organization_id)
+    return query.offset(skip).limit(limit).all()
 
 
 def update_organization(db: Session, organization_id: int, organization: schemas.OrganizationCreate) -> models.Organization:
@@ -37,71 +72,105 @@ def update_organization(db: Session, organization_id: int, organization: schemas
     for key, value in organization.model_dump().items():
         setattr(db_organization, key, value)
     
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Organization already exists")
     db.refresh(db_organization)
     return db_organization
 
 
-def delete_organization(db: Session, organization_id: int) -> bool:
+def delete_organization(db: Session, organization_id: int) -> models.BackgroundJob:
+    """Start an organization teardown job; the caller schedules teardown.teardown_organization"""
     db_organization = get_organization(db, organization_id)
     if not db_organization:
         raise HTTPException(status_code=404, detail="Organization not found")
     
-    db.delete(db_organization)
-    db.commit()
-    return True
+    return jobs.create_job(db, teardown.ORGANIZATION_TEARDOWN, target_id=organization_id)
 
 
 # User CRUD operations
-def create_user(db: Session, user: schemas.UserCreate) -> models.User:
-    # Check if email already exists
-    existing_user = db.query(models.User).filter(models.User.email == user.email).first()
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
-    # Check if organization exists, if not create it
-    organization = get_organization_by_name(db, user.organization_name)
-    if not organization:
-        organization = create_organization(db, schemas.OrganizationCreate(name=user.organization_name))
-    
-    # Get or create default role for the organization
-    default_role = db.query(models.Role).filter(
-        models.Role.name == "user",
-        models.Role.organization_id == organization.id
-    ).first()
+def _dialect_insert(db: Session):
+    """The dialect's INSERT construct, which supports ON CONFLICT on PostgreSQL and SQLite"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Registration upserts are not supported on {dialect}")
+    return insert
+
+
+def _get_or_insert_id(db: Session, model, values: dict, conflict_columns: Sequence[str]) -> Tuple[int, bool]:
+    """
+    Insert a row unless one with the same conflict columns exists, returning
+    (id, inserted). ON CONFLICT DO NOTHING lets concurrent signups for the
+    same new organization converge on one row without retries.
+    """
+    insert = _dialect_insert(db)
+    inserted_id = db.execute(
+        insert(model).values(**values).on_conflict_do_nothing(index_elements=conflict_columns).returning(model.id)
+    ).scalar()
+    if inserted_id is not None:
+        return inserted_id, True
+    existing_id = db.query(model.id).filter(
+        *[getattr(model, column) == values[column] for column in conflict_columns]
+    ).scalar()
+    return existing_id, False
+
+
+def create_user(db: Session, user: schemas.UserCreate, organization_id: Optional[int] = None) -> models.User:
+    """
+    Create a user, their organization and its default role (if new) in one
+    transaction. With organization_id the user joins that existing organization
+    and organization_name is ignored.
+    """
+    # CPU-bound work happens before the transaction starts holding locks
+    hashed_password = get_password_hash(user.password)
+    verification_code = email_service.generate_code()
     
-    if not default_role:
-        default_role = models.Role(name="user", organization_id=organization.id)
-        db.add(default_role)
+    try:
+        organization_created = False
+        if organization_id is None:
+            organization_id, organization_created = _get_or_insert_id(
+                db, models.Organization, {"name": user.organization_name}, ["name"]
+            )
+        if not organization_created and jobs.get_active_job(db, teardown.ORGANIZATION_TEARDOWN, organization_id):
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Organization is being deleted")
+        role_id, role_created = _get_or_insert_id(
+            db, models.Role, {"name": "user", "organization_id": organization_id}, ["organization_id", "name"]
+        )
+        if role_created:
+            catalog.bump_versions(db, catalog.organization_scope(organization_id))
+            events.emit(db, "role.created", "role", role_id, organization_id, name="user")
+        
+        user_data = user.model_dump(exclude={'password', 'organization_name'})
+        db_user = models.User(
+            **user_data, hashed_password=hashed_password, organization_id=organization_id, role_id=role_id
+        )
+        db.add(db_user)
+        db.flush()
+        events.emit(db, "user.role_assigned", "user", db_user.id, organization_id, role_id=role_id)
+        one_time_codes.issue_code(db, db_user.id, one_time_codes.EMAIL_VERIFICATION, verification_code)
         db.commit()
-        db.refresh(default_role)
+    except IntegrityError:
+        # The only constraint a well-formed signup can still violate is the unique email
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Hash the password
-    hashed_password = get_password_hash(user.password)
+    db.refresh(db_user)
+    # Drop any negative entry cached while the email was unknown
+    authorization_cache.invalidate_principals(db_user.email)
+    audit_log.record("user.created", "user", db_user.id, db_user.organization_id, email=db_user.email)
     
-    # Generate verification code (handle email service failures gracefully)
-    verification_code = None
+    # Sent after commit, so failed signups never receive a code
     try:
-        verification_code = email_service.generate_and_send_verification_code(user.email)
+        email_service.send_verification_email(db_user.email, verification_code)
     except Exception as e:
         print(f"Warning: Failed to send verification email: {e}")
-        # Generate a verification code anyway for testing
-        import random
-        import string
-        verification_code = ''.join(random.choices(string.digits, k=6))
-    
-    # Create user
-    user_data = user.model_dump(exclude={'password', 'organization_name'})
-    user_data['hashed_password'] = hashed_password
-    user_data['organization_id'] = organization.id
-    user_data['role_id'] = default_role.id
-    user_data['email_verification_code'] = verification_code
-    user_data['email_verification_expires'] = datetime.now(timezone.utc) + timedelta(minutes=10)
-    
-    db_user = models.User(**user_data)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
     return db_user
 
 
@@ -119,32 +188,21 @@ def verify_user_email(db: Session, email: str, verification_code: str) -> models
             raise HTTPException(status_code=404, detail="User not found")
         
         print(f"🔍 User details: ID={user.id}, Email={user.email}, Verified={user.is_email_verified}")
-        print(f"🔍 Stored verification code: {user.email_verification_code}")
-        print(f"🔍 Verification expires: {user.email_verification_expires}")
         
         if user.is_email_verified:
             print(f"❌ Email already verified for: {email}")
             raise HTTPException(status_code=400, detail="Email already verified")
         
-        if not user.email_verification_code:
-            print(f"❌ No verification code found for: {email}")
-            raise HTTPException(status_code=400, detail="No verification code found")
-        
-        if user.email_verification_expires < datetime.now(timezone.utc):
-            print(f"❌ Verification code expired for: {email}")
-            raise HTTPException(status_code=400, detail="Verification code expired")
-        
-        if user.email_verification_code != verification_code:
-            print(f"❌ Invalid verification code for: {email}. Expected: {user.email_verification_code}, Got: {verification_code}")
-            raise HTTPException(status_code=400, detail="Invalid verification code")
+        one_time_codes.check_code(
+            db, user.id, one_time_codes.EMAIL_VERIFICATION, verification_code, consume=True
+        )
         
         # Mark email as verified
         user.is_email_verified = True
-        user.email_verification_code = None
-        user.email_verification_expires = None
         
         db.commit()
         db.refresh(user)
+        authorization_cache.invalidate_principals(user.email)
         
         print(f"✅ Email verified successfully for: {email}")
         return user
@@ -171,8 +229,7 @@ def request_password_reset(db: Session, email: str) -> bool:
         raise HTTPException(status_code=500, detail="Failed to send password reset email")
     
     # Save reset code
-    user.password_reset_code = reset_code
-    user.password_reset_expires = datetime.now(timezone.utc) + timedelta(minutes=10)
+    one_time_codes.issue_code(db, user.id, one_time_codes.PASSWORD_RESET, reset_code)
     
     db.commit()
     return True
@@ -184,14 +241,7 @@ def verify_password_reset_code(db: Session, email: str, reset_code: str) -> bool
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    if not user.password_reset_code:
-        raise HTTPException(status_code=400, detail="No reset code found")
-    
-    if user.password_reset_expires < datetime.now(timezone.utc):
-        raise HTTPException(status_code=400, detail="Reset code expired")
-    
-    if user.password_reset_code != reset_code:
-        raise HTTPException(status_code=400, detail="Invalid reset code")
+    one_time_codes.check_code(db, user.id, one_time_codes.PASSWORD_RESET, reset_code)
     
     return True
 
@@ -202,46 +252,120 @@ def reset_password(db: Session, email: str, reset_code: str, new_password: str)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    if not user.password_reset_code:
-        raise HTTPException(status_code=400, detail="No reset code found")
-    
-    if user.password_reset_expires < datetime.now(timezone.utc):
-        raise HTTPException(status_code=400, detail="Reset code expired")
-    
-    if user.password_reset_code != reset_code:
-        raise HTTPException(status_code=400, detail="Invalid reset code")
+    one_time_codes.check_code(db, user.id, one_time_codes.PASSWORD_RESET, reset_code, consume=True)
     
     # Update password
     user.hashed_password = get_password_hash(new_password)
-    user.password_reset_code = None
-    user.password_reset_expires = None
     
     db.commit()
     db.refresh(user)
     return user
 
 
-def get_user(db: Session, user_id: int) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.id == user_id).first()
+def get_user(db: Session, user_id: int, organization_id: Optional[int] = None) -> Optional[models.User]:
+    query = db.query(models.User).filter(models.User.id == user_id)
+    return scope_query(query, models.User, organization_id).first()
 
 
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.email == email).first()
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[models.User]:
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_users(
+    db: Session, skip: int = 0, limit: int = 100, options: Sequence = (), organization_id: Optional[int] = None
+) -> List[models.User]:
+    query = scope_query(db.query(models.User).options(*options), models.User, organization_id)
+    return query.order_by(models.User.id).offset(skip).limit(limit).all()
+
+
+def get_users_by_organization(db: Session, organization_id: int, options: Sequence = ()) -> List[models.User]:
+    return db.query(models.User).options(*options).filter(models.User.organization_id == organization_id).all()
+
+
+def get_user_rows(
+    db: Session, fields: Sequence[str], skip: int = 0, limit: Optional[int] = 100, organization_id: Optional[int] = None
+) -> List[dict]:
+    """Fetch only the given user columns as plain dicts, bypassing ORM object construction"""
+    query = scope_query(db.query(*[getattr(models.User, field) for field in fields]), models.User, organization_id)
+    return [dict(zip(fields, row)) for row in query.order_by(models.User.id).offset(skip).limit(limit)]
+
 
+def _like_prefix(value: str) -> str:
+    """LIKE pattern matching strings that start with value (escape character: backslash)"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
 
-def get_users_by_organization(db: Session, organization_id: int) -> List[models.User]:
-    return db.query(models.User).filter(models.User.organization_id == organization_id).all()
 
+def _encode_search_cursor(rank: int, user_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{rank}:{user_id}".encode()).decode()
 
-def update_user(db: Session, user_id: int, user: schemas.UserCreate) -> models.User:
-    db_user = get_user(db, user_id)
+
+def _decode_search_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        rank, user_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return int(rank), int(user_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def search_users(
+    db: Session, organization_id: int, q: str, limit: int = 20, cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Case-insensitive prefix search over email, first and last name within one
+    organization. Results are ranked (exact email, email prefix, "first last"
+    prefix, first name prefix, last name prefix) and paged with a keyset cursor.
+    """
+    term = q.strip().lower()
+    if not term:
+        # An empty prefix would match, and rank, every user in the organization
+        raise HTTPException(status_code=400, detail="Search query must not be blank")
+    pattern = _like_prefix(term)
+    email = func.lower(models.User.email)
+    first_name = func.lower(models.User.first_name)
+    last_name = func.lower(models.User.last_name)
+
+    matches = [
+        email.like(pattern, escape="\\"),
+        first_name.like(pattern, escape="\\"),
+        last_name.like(pattern, escape="\\"),
+    ]
+    ranks = [(email == term, 0), (matches[0], 1)]
+    tokens = term.split()
+    if len(tokens) == 2:
+        full_name = and_(
+            first_name.like(_like_prefix(tokens[0]), escape="\\"),
+            last_name.like(_like_prefix(tokens[1]), escape="\\")
+        )
+        matches.append(full_name)
+        ranks.append((full_name, 2))
+    ranks += [(matches[1], 3), (matches[2], 4)]
+    rank = case(*ranks, else_=5).label("rank")
+
+    query = db.query(
+        models.User.id, models.User.first_name, models.User.last_name,
+        models.User.email, models.User.role_id, rank
+    ).filter(models.User.organization_id == organization_id, or_(*matches))
+    if cursor:
+        after_rank, after_id = _decode_search_cursor(cursor)
+        query = query.filter(or_(rank > after_rank, and_(rank == after_rank, models.User.id > after_id)))
+    rows = query.order_by(rank, models.User.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_search_cursor(rows[-1].rank, rows[-1].id)
+    return [row._asdict() for row in rows], next_cursor
+
+
+def update_user(
+    db: Session, user_id: int, user: schemas.UserCreate, organization_id: Optional[int] = None
+) -> models.User:
+    db_user = get_user(db, user_id, organization_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    previous_email = db_user.email
+    
     # Hash password if provided
     user_data = user.model_dump()
     if 'password' in user_data:
@@ -252,60 +376,156 @@ def update_user(db: Session, user_id: int, user: schemas.UserCreate) -> models.U
     
     db.commit()
     db.refresh(db_user)
+    authorization_cache.invalidate_principals(previous_email, db_user.email)
+    audit_log.record("user.updated", "user", db_user.id, db_user.organization_id, email=db_user.email)
     return db_user
 
 
-def delete_user(db: Session, user_id: int) -> bool:
-    db_user = get_user(db, user_id)
+def delete_user(db: Session, user_id: int, organization_id: Optional[int] = None) -> bool:
+    db_user = get_user(db, user_id, organization_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    # Remove rows that reference the user
+    db.query(models.OneTimeCode).filter(models.OneTimeCode.user_id == user_id).delete(synchronize_session=False)
+    db.query(models.RefreshToken).filter(models.RefreshToken.user_id == user_id).delete(synchronize_session=False)
     db.delete(db_user)
+    events.emit(db, "user.role_revoked", "user", user_id, db_user.organization_id, role_id=db_user.role_id)
     db.commit()
+    authorization_cache.invalidate_principals(db_user.email)
+    audit_log.record("user.deleted", "user", user_id, db_user.organization_id, email=db_user.email)
     return True
 
 
+def purge_unverified_users(db: Session, batch_size: int, max_age: timedelta) -> int:
+    """Delete up to batch_size accounts left unverified for longer than max_age, returning the number removed"""
+    cutoff = datetime.now(timezone.utc) - max_age
+    rows = db.query(
+        models.User.id, models.User.email, models.User.organization_id, models.User.role_id
+    ).filter(
+        models.User.is_email_verified.is_(False),
+        models.User.created_at < cutoff
+    ).order_by(models.User.id).limit(batch_size).with_for_update(skip_locked=True).all()
+    if not rows:
+        return 0
+    
+    user_ids = [row.id for row in rows]
+    db.query(models.OneTimeCode).filter(models.OneTimeCode.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.query(models.RefreshToken).filter(models.RefreshToken.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.query(models.User).filter(models.User.id.in_(user_ids)).delete(synchronize_session=False)
+    for row in rows:
+        events.emit(db, "user.role_revoked", "user", row.id, row.organization_id, role_id=row.role_id)
+    db.commit()
+    authorization_cache.invalidate_principals(*(row.email for row in rows))
+    for row in rows:
+        audit_log.record("user.purged", "user", row.id, row.organization_id, email=row.email, reason="unverified")
+    return len(rows)
+
+
 # Role CRUD operations
 def create_role(db: Session, role: schemas.RoleCreate) -> models.Role:
     db_role = models.Role(**role.model_dump())
     db.add(db_role)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Role already exists")
+    catalog.bump_versions(db, catalog.organization_scope(db_role.organization_id))
+    events.emit(db, "role.created", "role", db_role.id, db_role.organization_id, name=db_role.name)
     db.commit()
     db.refresh(db_role)
+    audit_log.record("role.created", "role", db_role.id, db_role.organization_id, name=db_role.name)
     return db_role
 
 
-def get_role(db: Session, role_id: int) -> Optional[models.Role]:
-    return db.query(models.Role).filter(models.Role.id == role_id).first()
+def get_role(db: Session, role_id: int, organization_id: Optional[int] = None) -> Optional[models.Role]:
+    query = db.query(models.Role).filter(models.Role.id == role_id)
+    return scope_query(query, models.Role, organization_id).first()
+
+
+def get_roles(
+    db: Session, skip: int = 0, limit: int = 100, options: Sequence = (), organization_id: Optional[int] = None
+) -> List[models.Role]:
+    query = scope_query(db.query(models.Role).options(*options), models.Role, organization_id)
+    return query.order_by(models.Role.id).offset(skip).limit(limit).all()
 
 
-def get_roles(db: Session, skip: int = 0, limit: int = 100) -> List[models.Role]:
-    return db.query(models.Role).offset(skip).limit(limit).all()
+def get_roles_by_organization(db: Session, organization_id: int, options: Sequence = ()) -> List[models.Role]:
+    return db.query(models.Role).options(*options).filter(models.Role.organization_id == organization_id).all()
 
 
-def get_roles_by_organization(db: Session, organization_id: int) -> List[models.Role]:
-    return db.query(models.Role).filter(models.Role.organization_id == organization_id).all()
+def get_role_version(db: Session, role_id: int, organization_id: Optional[int] = None) -> Optional[schemas.RoleVersion]:
+    """Read a role's and its organization's permissions_version without loading either object"""
+    query = db.query(
+        models.Role.id, models.Role.organization_id, models.Role.permissions_version,
+        models.Organization.permissions_version
+    ).join(models.Organization, models.Role.organization_id == models.Organization.id).filter(models.Role.id == role_id)
+    row = scope_query(query, models.Role, organization_id).first()
+    if row is None:
+        return None
+    return schemas.RoleVersion(
+        role_id=row[0], organization_id=row[1], permissions_version=row[2], organization_permissions_version=row[3]
+    )
 
 
-def update_role(db: Session, role_id: int, role: schemas.RoleCreate) -> models.Role:
-    db_role = get_role(db, role_id)
+def get_role_rows(
+    db: Session, fields: Sequence[str], skip: int = 0, limit: Optional[int] = 100, organization_id: Optional[int] = None
+) -> List[dict]:
+    """Fetch only the given role columns as plain dicts, bypassing ORM object construction"""
+    query = scope_query(db.query(*[getattr(models.Role, field) for field in fields]), models.Role, organization_id)
+    return [dict(zip(fields, row)) for row in query.order_by(models.Role.id).offset(skip).limit(limit)]
+
+
+def update_role(
+    db: Session, role_id: int, role: schemas.RoleCreate, organization_id: Optional[int] = None
+) -> models.Role:
+    db_role = get_role(db, role_id, organization_id)
     if not db_role:
         raise HTTPException(status_code=404, detail="Role not found")
     
+    previous_organization_id = db_role.organization_id
     for key, value in role.model_dump().items():
         setattr(db_role, key, value)
     
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Role already exists")
+    catalog.bump_versions(
+        db,
+        catalog.organization_scope(previous_organization_id),
+        catalog.organization_scope(db_role.organization_id)
+    )
+    _bump_permissions_versions(db, [role_id], [previous_organization_id, db_role.organization_id])
+    if previous_organization_id != db_role.organization_id:
+        # Subscribers of the old organization only see events scoped to it
+        events.emit(db, "role.deleted", "role", role_id, previous_organization_id, name=db_role.name)
+        events.emit(db, "role.created", "role", role_id, db_role.organization_id, name=db_role.name)
+    else:
+        events.emit(db, "role.updated", "role", role_id, db_role.organization_id, name=db_role.name)
     db.commit()
     db.refresh(db_role)
+    _invalidate_roles(role_id)
+    audit_log.record(
+        "role.updated", "role", role_id, db_role.organization_id,
+        name=db_role.name, previous_organization_id=previous_organization_id
+    )
     return db_role
 
 
-def delete_role(db: Session, role_id: int) -> bool:
-    db_role = get_role(db, role_id)
+def delete_role(db: Session, role_id: int, organization_id: Optional[int] = None) -> bool:
+    db_role = get_role(db, role_id, organization_id)
     if not db_role:
         raise HTTPException(status_code=404, detail="Role not found")
     
     db.delete(db_role)
+    catalog.bump_versions(db, catalog.organization_scope(db_role.organization_id))
+    events.emit(db, "role.deleted", "role", role_id, db_role.organization_id, name=db_role.name)
     db.commit()
+    _invalidate_roles(role_id)
+    audit_log.record("role.deleted", "role", role_id, db_role.organization_id, name=db_role.name)
     return True
 
 
@@ -313,8 +533,12 @@ def delete_role(db: Session, role_id: int) -> bool:
 def create_permission(db: Session, permission: schemas.PermissionCreate) -> models.Permission:
     db_permission = models.Permission(**permission.model_dump())
     db.add(db_permission)
+    catalog.bump_versions(db, catalog.GLOBAL_SCOPE)
+    db.flush()
+    events.emit(db, "permission.created", "permission", db_permission.id, name=db_permission.name)
     db.commit()
     db.refresh(db_permission)
+    audit_log.record("permission.created", "permission", db_permission.id, name=db_permission.name)
     return db_permission
 
 
@@ -334,8 +558,14 @@ def update_permission(db: Session, permission_id: int, permission: schemas.Permi
     for key, value in permission.model_dump().items():
         setattr(db_permission, key, value)
     
+    # Roles embed their permissions, so this also invalidates every role listing
+    catalog.bump_versions(db, catalog.GLOBAL_SCOPE)
+    role_ids = [role.id for role in db_permission.roles]
+    events.emit(db, "permission.updated", "permission", permission_id, name=db_permission.name)
     db.commit()
     db.refresh(db_permission)
+    _invalidate_roles(*role_ids)
+    audit_log.record("permission.updated", "permission", permission_id, name=db_permission.name)
     return db_permission
 
 
@@ -344,14 +574,23 @@ def delete_permission(db: Session, permission_id: int) -> bool:
     if not db_permission:
         raise HTTPException(status_code=404, detail="Permission not found")
     
+    role_ids = [role.id for role in db_permission.roles]
+    organization_ids = [role.organization_id for role in db_permission.roles]
     db.delete(db_permission)
+    catalog.bump_versions(db, catalog.GLOBAL_SCOPE)
+    _bump_permissions_versions(db, role_ids, organization_ids)
+    events.emit(db, "permission.deleted", "permission", permission_id, name=db_permission.name)
     db.commit()
+    _invalidate_roles(*role_ids)
+    audit_log.record("permission.deleted", "permission", permission_id, name=db_permission.name, role_ids=role_ids)
     return True
 
 
 # Role-Permission CRUD operations
-def assign_permission_to_role(db: Session, role_id: int, permission_id: int) -> models.Role:
-    db_role = get_role(db, role_id)
+def assign_permission_to_role(
+    db: Session, role_id: int, permission_id: int, organization_id: Optional[int] = None
+) -> models.Role:
+    db_role = get_role(db, role_id, organization_id)
     if not db_role:
         raise HTTPException(status_code=404, detail="Role not found")
     
@@ -361,14 +600,27 @@ def assign_permission_to_role(db: Session, role_id: int, permission_id: int) ->
     
     if db_permission not in db_role.permissions:
         db_role.permissions.append(db_permission)
+        catalog.bump_versions(db, catalog.organization_scope(db_role.organization_id))
+        _bump_permissions_versions(db, [role_id], [db_role.organization_id])
+        events.emit(
+            db, "role.permission_assigned", "role", role_id, db_role.organization_id,
+            permission_id=permission_id, permission=db_permission.name
+        )
         db.commit()
         db.refresh(db_role)
+        _invalidate_roles(role_id)
+        audit_log.record(
+            "role.permission_assigned", "role", role_id, db_role.organization_id,
+            permission_id=permission_id, permission=db_permission.name
+        )
     
     return db_role
 
 
-def remove_permission_from_role(db: Session, role_id: int, permission_id: int) -> models.Role:
-    db_role = get_role(db, role_id)
+def remove_permission_from_role(
+    db: Session, role_id: int, permission_id: int, organization_id: Optional[int] = None
+) -> models.Role:
+    db_role = get_role(db, role_id, organization_id)
     if not db_role:
         raise HTTPException(status_code=404, detail="Role not found")
     
@@ -378,7 +630,18 @@ def remove_permission_from_role(db: Session, role_id: int, permission_id: int) -
     
     if db_permission in db_role.permissions:
         db_role.permissions.remove(db_permission)
+        catalog.bump_versions(db, catalog.organization_scope(db_role.organization_id))
+        _bump_permissions_versions(db, [role_id], [db_role.organization_id])
+        events.emit(
+            db, "role.permission_removed", "role", role_id, db_role.organization_id,
+            permission_id=permission_id, permission=db_permission.name
+        )
         db.commit()
         db.refresh(db_role)
+        _invalidate_roles(role_id)
+        audit_log.record(
+            "role.permission_removed", "role", role_id, db_role.organization_id,
+            permission_id=permission_id, permission=db_permission.name
+        )
     
     return db_role
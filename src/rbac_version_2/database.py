@@ -1,13 +1,28 @@
-from sqlalchemy import create_engine
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
 from urllib.parse import quote_plus
 from .config import settings
 
+# Session.info keys used for read/write routing
+USE_REPLICA = "use_replica"
+PINNED_TO_PRIMARY = "pinned_to_primary"
+CHOSEN_REPLICA = "chosen_replica"
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
 # Handle database URL with special characters in password
-def get_database_url():
+def get_database_url(database_url: Optional[str] = None):
     """Get the database URL with proper encoding for special characters"""
-    database_url = settings.database_url
+    database_url = database_url or settings.database_url
     
     # If the URL contains special characters in the password, encode them
     if '@' in database_url and '://' in database_url:
@@ -31,30 +46,206 @@ def get_database_url():
     
     return database_url
 
+# Checkout wait histogram bucket upper bounds, in milliseconds
+WAIT_BUCKETS_MS = (1, 10, 100, 1000)
+
+
+class PoolMetrics:
+    """Connection checkout counts and wait times"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        wait_ms = wait * 1000
+        bucket = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if wait_ms < bound), len(WAIT_BUCKETS_MS))
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.buckets[bucket] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            labels = [f"<{bound}ms" for bound in WAIT_BUCKETS_MS] + [f">={WAIT_BUCKETS_MS[-1]}ms"]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait * 1000 / attempts, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "wait_histogram": dict(zip(labels, self.buckets)),
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that measures how long each checkout waits for a connection"""
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return connection
+
+    def stats(self) -> dict:
+        return dict(
+            self.metrics.snapshot(),
+            size=self.size(),
+            checked_out=self.checkedout(),
+            checked_in=self.checkedin(),
+            overflow=self.overflow(),
+        )
+
+
+def pool_options(url: str) -> dict:
+    """Engine keyword arguments for the configured pool mode"""
+    options = {
+        "pool_pre_ping": settings.database_pool_pre_ping,
+        "query_cache_size": settings.database_query_cache_size,
+    }
+    if settings.database_pool_mode == "null":
+        # The external pooler owns connections; SQLAlchemy opens one per checkout
+        options["poolclass"] = NullPool
+    elif settings.database_pool_mode == "queue":
+        if make_url(url).get_backend_name() == "sqlite":
+            # SQLite picks its own pool class (in-memory databases need a single connection)
+            return options
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout,
+            pool_recycle=settings.database_pool_recycle,
+        )
+    else:
+        raise ValueError(f"Unknown database pool mode: {settings.database_pool_mode}")
+    return options
+
+
+def pool_stats(target: Engine) -> dict:
+    pool = target.pool
+    if isinstance(pool, TimedQueuePool):
+        return pool.stats()
+    return {"pool": type(pool).__name__}
+
+
 # Create database engine with connection retry
-def create_database_engine():
+def create_database_engine(database_url: Optional[str] = None):
     """Create database engine with proper error handling"""
     try:
-        url = get_database_url()
+        url = get_database_url(database_url)
         print(f"Connecting to database with URL: {url.replace('Gulab%40123000', '***')}")  # Hide password in logs
-        return create_engine(url, pool_pre_ping=True, pool_recycle=300)
+        return create_engine(url, **pool_options(url))
     except Exception as e:
         print(f"Error creating database engine: {e}")
         raise
 
+
+class ReplicaSet:
+    """Round-robin over read replicas, skipping replicas that recently failed"""
+
+    def __init__(self, engines: List[Engine], retry_seconds: float):
+        self.engines = engines
+        self.retry_seconds = retry_seconds
+        self._down_until: Dict[Engine, float] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        for replica in engines:
+            event.listen(replica, "handle_error", self._on_error)
+
+    def choose(self) -> Optional[Engine]:
+        """Next healthy replica, or None to fall back to the primary"""
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            with self._lock:
+                replica = self.engines[next(self._counter) % len(self.engines)]
+            if self._down_until.get(replica, 0.0) <= now:
+                return replica
+        return None
+
+    def mark_down(self, replica: Engine, error: Exception) -> None:
+        self._down_until[replica] = time.monotonic() + self.retry_seconds
+        print(f"⚠️  Warning: Replica {replica.url.render_as_string(hide_password=True)} marked down: {error}")
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+            self.mark_down(context.engine, context.original_exception)
+
+    def status(self) -> List[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "url": replica.url.render_as_string(hide_password=True),
+                "healthy": self._down_until.get(replica, 0.0) <= now,
+            }
+            for replica in self.engines
+        ]
+
+
+class RoutingSession(Session):
+    """
+    Sends plain SELECTs to a replica when the session is marked read-only.
+    The replica is chosen once per session, so all reads see the same
+    point in time. Once the session flushes, runs a DML statement or locks
+    rows with SELECT ... FOR UPDATE it stays on the primary, so later reads
+    in the same request see its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get(USE_REPLICA) and not self.info.get(PINNED_TO_PRIMARY):
+            if (
+                self._flushing
+                or (clause is not None and not getattr(clause, "is_select", False))
+                or getattr(clause, "_for_update_arg", None) is not None
+            ):
+                self.info[PINNED_TO_PRIMARY] = True
+            elif replica_set.engines:
+                if CHOSEN_REPLICA not in self.info:
+                    self.info[CHOSEN_REPLICA] = replica_set.choose()
+                if self.info[CHOSEN_REPLICA] is not None:
+                    return self.info[CHOSEN_REPLICA]
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
 # Create database engine
 engine = create_database_engine()
 
+replica_set = ReplicaSet(
+    [create_database_engine(url.strip()) for url in settings.database_replica_urls.split(",") if url.strip()],
+    settings.database_replica_retry_seconds
+)
+
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 
 # Create Base class
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency to get database session"""
+def get_db(request: Request):
+    """
+    Dependency to get database session. Reads in GET requests go to a replica
+    unless the client sends X-Consistency: primary (e.g. right after a write).
+    """
     db = SessionLocal()
+    if request.method in READ_METHODS and request.headers.get("X-Consistency", "").lower() != "primary":
+        db.info[USE_REPLICA] = True
     try:
         yield db
     finally:
@@ -19,6 +19,10 @@ class EmailService:
         """Generate a 6-digit verification code"""
         return ''.join(random.choices(string.digits, k=6))
 
+    def generate_code(self) -> str:
+        """Generate a 6-digit code without sending it"""
+        return self._generate_verification_code()
+
     def _send_email(self, to_email: str, subject: str, body: str) -> bool:
         """Send email using SMTP"""
         try:
@@ -0,0 +1,248 @@
+"""
+RBAC change notifications.
+
+Mutations in crud.py add a row to rbac_events in the same transaction as the
+change they describe (a transactional outbox), so an event exists exactly
+when its change committed, and its id is the event's sequence number. Each
+worker runs a broadcaster that polls the table and fans new events out to
+its connected streams, so streams see changes made by any worker.
+
+Sequence numbers are assigned at insert time, so a transaction can commit a
+higher number before a concurrent one commits a lower number. The
+broadcaster therefore delivers strictly in sequence order and waits up to
+RBAC_EVENTS_GAP_SECONDS for a missing number before treating it as rolled
+back. Clients resume from the last sequence they saw.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.orm import Session
+from .config import settings
+from .database import SessionLocal
+from .models import RBACEvent
+
+PAGE_SIZE = 500
+PRUNE_INTERVAL_SECONDS = 60
+RETRY_MS = 3000
+
+
+def emit(db: Session, event_type: str, resource_type: str, resource_id: Optional[int] = None,
+         organization_id: Optional[int] = None, **data: Any) -> None:
+    """Add a change event to the caller's transaction (caller commits)"""
+    db.add(RBACEvent(
+        occurred_at=datetime.now(timezone.utc),
+        organization_id=organization_id,
+        event_type=event_type,
+        resource_type=resource_type,
+        resource_id=resource_id,
+        data=json.dumps(data, default=str) if data else None,
+    ))
+
+
+def _as_dict(row: RBACEvent) -> Dict[str, Any]:
+    return {
+        "sequence": row.id,
+        "type": row.event_type,
+        "occurred_at": row.occurred_at.isoformat(),
+        "organization_id": row.organization_id,
+        "resource_type": row.resource_type,
+        "resource_id": row.resource_id,
+        "data": json.loads(row.data) if row.data else {},
+    }
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    """Encode one event as a server-sent event frame"""
+    return f"id: {event['sequence']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+def _visible(event: Dict[str, Any], organization_id: int) -> bool:
+    return event["organization_id"] is None or event["organization_id"] == organization_id
+
+
+class Subscription:
+    def __init__(self, organization_id: int, start: int, queue_size: int):
+        self.organization_id = organization_id
+        # Events up to this sequence were delivered before the subscription existed
+        self.start = start
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.lagged = False
+
+
+class EventBroadcaster:
+    def __init__(self, session_factory: Callable[[], Session], poll_interval: float, gap_timeout: float,
+                 heartbeat: float, queue_size: int, retention: timedelta):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.gap_timeout = gap_timeout
+        self.heartbeat = heartbeat
+        self.queue_size = queue_size
+        self.retention = retention
+        # Highest sequence handed to subscribers; None until the first poll
+        self.sequence: Optional[int] = None
+        self._gap_since: Optional[float] = None
+        self._poll_lock = threading.Lock()
+        self._subscriptions: List[Subscription] = []
+        self._metrics = {"delivered": 0, "lagged_disconnects": 0, "gaps_skipped": 0, "pruned": 0}
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """Fetch newly committed events in sequence order, holding back behind gaps"""
+        with self._poll_lock:
+            db = self.session_factory()
+            try:
+                if self.sequence is None:
+                    self.sequence = db.scalar(select(func.max(RBACEvent.id))) or 0
+                    return []
+                ready: List[Dict[str, Any]] = []
+                while True:
+                    rows = db.query(RBACEvent).filter(RBACEvent.id > self.sequence).order_by(
+                        RBACEvent.id
+                    ).limit(PAGE_SIZE).all()
+                    for row in rows:
+                        if row.id != self.sequence + 1:
+                            # The missing sequence may belong to a transaction that has not committed yet
+                            now = time.monotonic()
+                            if self._gap_since is None:
+                                self._gap_since = now
+                            if now - self._gap_since < self.gap_timeout:
+                                return ready
+                            self._metrics["gaps_skipped"] += row.id - self.sequence - 1
+                        self._gap_since = None
+                        ready.append(_as_dict(row))
+                        self.sequence = row.id
+                    if len(rows) < PAGE_SIZE:
+                        return ready
+            finally:
+                db.close()
+
+    def history(self, organization_id: int, after: int, upto: int, limit: int = PAGE_SIZE) -> List[Dict[str, Any]]:
+        """Events visible to an organization with after < sequence <= upto"""
+        db = self.session_factory()
+        try:
+            rows = db.query(RBACEvent).filter(
+                RBACEvent.id > after,
+                RBACEvent.id <= upto,
+                or_(RBACEvent.organization_id.is_(None), RBACEvent.organization_id == organization_id),
+            ).order_by(RBACEvent.id).limit(limit).all()
+            return [_as_dict(row) for row in rows]
+        finally:
+            db.close()
+
+    def oldest_sequence(self) -> Optional[int]:
+        db = self.session_factory()
+        try:
+            return db.scalar(select(func.min(RBACEvent.id)))
+        finally:
+            db.close()
+
+    def prune(self) -> int:
+        """Delete events older than the retention window, always keeping the newest one"""
+        cutoff = datetime.now(timezone.utc) - self.retention
+        db = self.session_factory()
+        try:
+            newest = db.scalar(select(func.max(RBACEvent.id)))
+            if newest is None:
+                return 0
+            # Keeping the newest row stops SQLite from reusing sequence numbers
+            deleted = db.execute(
+                delete(RBACEvent).where(RBACEvent.occurred_at < cutoff, RBACEvent.id < newest)
+            ).rowcount
+            db.commit()
+            self._metrics["pruned"] += deleted
+            return deleted
+        finally:
+            db.close()
+
+    def publish(self, events: List[Dict[str, Any]]) -> None:
+        for subscription in list(self._subscriptions):
+            for event in events:
+                if not _visible(event, subscription.organization_id):
+                    continue
+                try:
+                    subscription.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    # The client reconnects with Last-Event-ID and catches up from the table
+                    subscription.lagged = True
+                    self._subscriptions.remove(subscription)
+                    self._metrics["lagged_disconnects"] += 1
+                    break
+                self._metrics["delivered"] += 1
+
+    async def run(self) -> None:
+        """Poll for committed events and publish them to this worker's streams"""
+        last_prune = 0.0
+        while True:
+            try:
+                self.publish(await run_in_threadpool(self.poll))
+                if time.monotonic() - last_prune >= PRUNE_INTERVAL_SECONDS:
+                    last_prune = time.monotonic()
+                    await run_in_threadpool(self.prune)
+            except Exception as e:
+                print(f"⚠️  Warning: RBAC event poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def stream(self, organization_id: int, since: Optional[int] = None) -> AsyncIterator[str]:
+        """Server-sent events for one organization, replaying events after since first"""
+        if self.sequence is None:
+            await run_in_threadpool(self.poll)
+        subscription = Subscription(organization_id, self.sequence, self.queue_size)
+        self._subscriptions.append(subscription)
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            # A client last served by a worker that was further ahead has already seen up to since
+            last = max(subscription.start, since or 0)
+            if since is not None and since < subscription.start:
+                oldest = await run_in_threadpool(self.oldest_sequence)
+                if oldest is not None and since < oldest - 1:
+                    # Events after since were pruned; the client must resynchronize from scratch
+                    yield format_event({
+                        "sequence": subscription.start,
+                        "type": "reset",
+                        "occurred_at": datetime.now(timezone.utc).isoformat(),
+                        "organization_id": organization_id,
+                        "resource_type": "stream",
+                        "resource_id": None,
+                        "data": {"requested_since": since, "oldest_available": oldest},
+                    })
+                else:
+                    after = since
+                    while True:
+                        page = await run_in_threadpool(self.history, organization_id, after, subscription.start)
+                        for event in page:
+                            yield format_event(event)
+                        if len(page) < PAGE_SIZE:
+                            break
+                        after = page[-1]["sequence"]
+            while True:
+                if subscription.lagged and subscription.queue.empty():
+                    return
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event["sequence"] > last:
+                    last = event["sequence"]
+                    yield format_event(event)
+        finally:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._metrics, sequence=self.sequence, subscribers=len(self._subscriptions))
+
+
+event_broadcaster = EventBroadcaster(
+    SessionLocal,
+    poll_interval=settings.rbac_events_poll_seconds,
+    gap_timeout=settings.rbac_events_gap_seconds,
+    heartbeat=settings.rbac_events_heartbeat_seconds,
+    queue_size=settings.rbac_events_queue_size,
+    retention=timedelta(hours=settings.rbac_events_retention_hours),
+)
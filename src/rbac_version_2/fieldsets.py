@@ -0,0 +1,104 @@
+"""
+Sparse fieldsets for list endpoints.
+
+Clients pass ``fields=`` (comma-separated scalar fields) and ``expand=``
+(comma-separated relationships). The requested shape drives both the
+loader options, so unrequested columns and relationships are never
+fetched, and the serialized payload.
+"""
+
+from dataclasses import dataclass
+from typing import FrozenSet, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy.orm import joinedload, load_only, raiseload, selectinload
+from . import models
+
+USER_FIELDS = ("id", "first_name", "last_name", "email", "organization_id", "role_id", "is_email_verified", "created_at")
+USER_EXPANSIONS = ("organization", "role", "role.permissions")
+
+ROLE_FIELDS = ("id", "name", "organization_id", "created_at", "permissions_version")
+ROLE_EXPANSIONS = ("permissions",)
+
+
+@dataclass(frozen=True)
+class Fieldset:
+    fields: Tuple[str, ...]
+    expand: FrozenSet[str]
+
+
+def _parse(raw: Optional[str], allowed: Tuple[str, ...], param: str) -> Optional[List[str]]:
+    if raw is None:
+        return None
+    values = [value.strip() for value in raw.split(",") if value.strip()]
+    unknown = [value for value in values if value not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown {param}: {', '.join(unknown)}. Allowed: {', '.join(allowed)}"
+        )
+    return values
+
+
+def _resolve(fields: Optional[str], expand: Optional[str], all_fields, all_expansions) -> Fieldset:
+    requested_fields = _parse(fields, all_fields, "fields")
+    requested_expand = _parse(expand, all_expansions, "expand")
+
+    # Without either parameter the full legacy shape is returned
+    if requested_fields is None and requested_expand is None:
+        return Fieldset(all_fields, frozenset(all_expansions))
+
+    expansions = set(requested_expand or [])
+    for expansion in list(expansions):
+        if "." in expansion:
+            expansions.add(expansion.split(".", 1)[0])
+
+    selected = requested_fields or list(all_fields)
+    return Fieldset(tuple(f for f in all_fields if f in selected), frozenset(expansions))
+
+
+def resolve_user_fieldset(fields: Optional[str], expand: Optional[str]) -> Fieldset:
+    return _resolve(fields, expand, USER_FIELDS, USER_EXPANSIONS)
+
+
+def resolve_role_fieldset(fields: Optional[str], expand: Optional[str]) -> Fieldset:
+    return _resolve(fields, expand, ROLE_FIELDS, ROLE_EXPANSIONS)
+
+
+def user_load_options(fieldset: Fieldset) -> list:
+    """Loader options that fetch only what the fieldset needs"""
+    options = [load_only(*[getattr(models.User, f) for f in fieldset.fields])]
+    if "organization" in fieldset.expand:
+        options.append(joinedload(models.User.organization))
+    if "role" in fieldset.expand:
+        role_loader = joinedload(models.User.role)
+        if "role.permissions" in fieldset.expand:
+            role_loader = role_loader.selectinload(models.Role.permissions)
+        options.append(role_loader)
+    options.append(raiseload("*"))
+    return options
+
+
+def role_load_options(fieldset: Fieldset) -> list:
+    """Loader options that fetch only what the fieldset needs"""
+    options = [load_only(*[getattr(models.Role, f) for f in fieldset.fields])]
+    if "permissions" in fieldset.expand:
+        options.append(selectinload(models.Role.permissions))
+    options.append(raiseload("*"))
+    return options
+
+
+def shape_role(role: models.Role, fieldset: Fieldset) -> dict:
+    data = {field: getattr(role, field) for field in fieldset.fields}
+    if "permissions" in fieldset.expand:
+        data["permissions"] = role.permissions
+    return data
+
+
+def shape_user(user: models.User, fieldset: Fieldset) -> dict:
+    data = {field: getattr(user, field) for field in fieldset.fields}
+    if "organization" in fieldset.expand:
+        data["organization"] = user.organization
+    if "role" in fieldset.expand:
+        role_expand = frozenset({"permissions"}) if "role.permissions" in fieldset.expand else frozenset()
+        data["role"] = shape_role(user.role, Fieldset(ROLE_FIELDS, role_expand))
+    return data
@@ -4,11 +4,7 @@ Database initialization script for RBAC system.
 This script creates sample organizations, roles, permissions, and users.
 """
 
-import asyncio
-from sqlalchemy.orm import Session
 from .database import SessionLocal, engine, Base
-from .models import Organization, User, Role, Permission
-from .auth import get_password_hash
 from . import crud, schemas
 
 
@@ -27,6 +23,8 @@ def init_db():
             {"name": "manage_permissions", "description": "Manage permissions"},
             {"name": "manage_organizations", "description": "Manage organizations"},
             {"name": "view_organizations", "description": "View organizations"},
+            {"name": "introspect_tokens", "description": "Introspect access tokens"},
+            {"name": "read_metrics", "description": "View runtime metrics"},
         ]
         
         permissions = []
@@ -61,8 +59,10 @@ def init_db():
         for permission in permissions:
             crud.assign_permission_to_role(db, admin_role.id, permission.id)
         
-        # Manager gets most permissions except manage_organizations
-        manager_permissions = [p for p in permissions if p.name != "manage_organizations"]
+        # Manager gets most permissions except manage_organizations, token introspection and metrics
+        manager_permissions = [
+            p for p in permissions if p.name not in ("manage_organizations", "introspect_tokens", "read_metrics")
+        ]
         for permission in manager_permissions:
             crud.assign_permission_to_role(db, manager_role.id, permission.id)
         
@@ -75,32 +75,21 @@ def init_db():
         
         # Create sample users
         users_data = [
-            {
-                "name": "Admin User",
-                "email": "admin@example.com",
-                "password": "admin123",
-                "organization_id": org.id,
-                "role_id": admin_role.id
-            },
-            {
-                "name": "Manager User",
-                "email": "manager@example.com",
-                "password": "manager123",
-                "organization_id": org.id,
-                "role_id": manager_role.id
-            },
-            {
-                "name": "Regular User",
-                "email": "user@example.com",
-                "password": "user123",
-                "organization_id": org.id,
-                "role_id": user_role.id
-            }
+            ({"first_name": "Admin", "last_name": "User", "email": "admin@example.com", "password": "admin123"},
+             admin_role),
+            ({"first_name": "Manager", "last_name": "User", "email": "manager@example.com", "password": "manager123"},
+             manager_role),
+            ({"first_name": "Regular", "last_name": "User", "email": "user@example.com", "password": "user123"},
+             user_role),
         ]
         
-        for user_data in users_data:
-            user = crud.create_user(db, schemas.UserCreate(**user_data))
-            print(f"Created user: {user.name} ({user.email})")
+        for user_data, role in users_data:
+            user = crud.create_user(db, schemas.UserCreate(**user_data, organization_name=org.name))
+            # Registration assigns the default role and requires verification; sample users skip both
+            user.role_id = role.id
+            user.is_email_verified = True
+            db.commit()
+            print(f"Created user: {user.first_name} {user.last_name} ({user.email}) as {role.name}")
         
         print("\nDatabase initialization completed successfully!")
         print("\nSample users created:")
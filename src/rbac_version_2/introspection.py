@@ -0,0 +1,99 @@
+"""
+Batch token introspection for services that cannot verify JWTs themselves.
+
+Decoding a token (signature and expiry) is cached per token, keyed by its
+SHA-256, until the token expires; invalid tokens are cached briefly.
+Revocation, account state and permissions are evaluated on every call from
+in-memory state (the revocation list, the principal cache and the policy
+engine), so a revoked token or a changed role is reflected immediately
+rather than when the token expires.
+"""
+
+import hashlib
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence
+from .auth import decode_token, load_principals
+from .cache import CacheBackend, CacheMetrics, InMemoryLRUCache
+from .config import settings
+from .policy import policy_engine
+from .token_store import revocation_list
+
+NAMESPACE = "introspection"
+
+# Stored in place of claims for tokens that failed verification
+_INVALID = "__invalid__"
+
+INACTIVE = {"active": False}
+
+
+class TokenIntrospector:
+    def __init__(self, cache: CacheBackend, negative_ttl: float):
+        self.cache = cache
+        self.negative_ttl = negative_ttl
+        self.metrics = CacheMetrics()
+
+    def claims(self, token: str) -> Optional[Dict[str, Any]]:
+        """Verified claims of a token, or None if it is invalid or expired"""
+        key = hashlib.sha256(token.encode()).hexdigest()
+        cached = self.cache.get(key)
+        if cached == _INVALID:
+            self.metrics.incr(NAMESPACE, "negative_hits")
+            return None
+        if cached is not None:
+            self.metrics.incr(NAMESPACE, "hits")
+            claims = json.loads(cached)
+            # The cache expires on the monotonic clock; exp is wall-clock time
+            return claims if claims["exp"] > time.time() else None
+
+        self.metrics.incr(NAMESPACE, "misses")
+        claims = decode_token(token)
+        if claims is None or claims.get("sub") is None or not isinstance(claims.get("exp"), (int, float)):
+            self.cache.set(key, _INVALID, self.negative_ttl)
+            claims = None
+        else:
+            self.cache.set(key, json.dumps(claims), claims["exp"] - time.time())
+        self.metrics.incr(NAMESPACE, "sets")
+        return claims
+
+    def introspect(self, tokens: Sequence[str]) -> List[Dict[str, Any]]:
+        """Introspect tokens in request order; duplicates and shared subjects are looked up once"""
+        claims_by_token = {token: self.claims(token) for token in dict.fromkeys(tokens)}
+        live = {
+            token: claims for token, claims in claims_by_token.items()
+            # Refresh tokens are only ever presented to this service
+            if claims is not None and claims.get("type") == "access"
+            and not revocation_list.is_revoked(claims.get("jti"), claims.get("fid"))
+        }
+        principals = load_principals({claims["sub"] for claims in live.values()})
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for token in claims_by_token:
+            claims = live.get(token)
+            principal = principals.get(claims["sub"]) if claims else None
+            if principal is None or not principal.is_email_verified:
+                results[token] = INACTIVE
+                continue
+            grants, permissions, _ = policy_engine.permissions_of(principal)
+            results[token] = {
+                "active": True,
+                "sub": principal.email,
+                "user_id": principal.id,
+                "organization_id": principal.organization_id,
+                "role_id": principal.role_id,
+                "role": grants.name if grants else None,
+                "permissions": list(permissions),
+                "token_type": claims["type"],
+                "jti": claims.get("jti"),
+                "exp": int(claims["exp"]),
+            }
+        return [results[token] for token in tokens]
+
+    def stats(self) -> Dict[str, Any]:
+        return self.metrics.snapshot().get(NAMESPACE, {})
+
+
+token_introspector = TokenIntrospector(
+    InMemoryLRUCache(settings.introspection_cache_size),
+    negative_ttl=settings.introspection_negative_ttl_seconds,
+)
@@ -0,0 +1,95 @@
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+from .models import BackgroundJob
+from . import schemas
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+def get_active_job(db: Session, kind: str, target_id: int) -> Optional[BackgroundJob]:
+    """The pending or running job of this kind for a target, if any"""
+    return db.query(BackgroundJob).filter(
+        BackgroundJob.kind == kind,
+        BackgroundJob.target_id == target_id,
+        BackgroundJob.status.in_([PENDING, RUNNING])
+    ).first()
+
+
+def create_job(db: Session, kind: str, target_id: Optional[int] = None) -> BackgroundJob:
+    """Create a pending job, or return the unfinished job already running for the same target"""
+    if target_id is not None:
+        existing = get_active_job(db, kind, target_id)
+        if existing:
+            return existing
+
+    job = BackgroundJob(id=str(uuid.uuid4()), kind=kind, target_id=target_id, status=PENDING, progress="{}")
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_job(db: Session, job_id: str) -> Optional[BackgroundJob]:
+    return db.query(BackgroundJob).filter(BackgroundJob.id == job_id).first()
+
+
+def find_stale_jobs(db: Session, kind: str, stale_after: float) -> List[BackgroundJob]:
+    """Unfinished jobs of this kind whose updated_at is older than stale_after seconds, oldest first"""
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=stale_after)
+    return db.query(BackgroundJob).filter(
+        BackgroundJob.kind == kind,
+        BackgroundJob.status.in_([PENDING, RUNNING]),
+        BackgroundJob.updated_at < stale_before
+    ).order_by(BackgroundJob.updated_at).all()
+
+
+def claim_job(db: Session, job_id: str, stale_after: float) -> bool:
+    """
+    Atomically mark a job RUNNING for the caller. Only one caller wins a pending
+    job; a running job whose updated_at (its heartbeat) is older than stale_after
+    seconds is assumed to have lost its worker and can be taken over.
+    """
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=stale_after)
+    claimed = db.query(BackgroundJob).filter(
+        BackgroundJob.id == job_id,
+        or_(
+            BackgroundJob.status == PENDING,
+            and_(BackgroundJob.status == RUNNING, BackgroundJob.updated_at < stale_before)
+        )
+    ).update({BackgroundJob.status: RUNNING, BackgroundJob.updated_at: func.now()}, synchronize_session=False)
+    db.commit()
+    return claimed == 1
+
+
+def update_job(db: Session, job_id: str, status: Optional[str] = None,
+               progress: Optional[dict] = None, error: Optional[str] = None) -> None:
+    """Record job state in its own short transaction; also refreshes updated_at, the job's heartbeat"""
+    values = {}
+    if status is not None:
+        values[BackgroundJob.status] = status
+    if progress is not None:
+        values[BackgroundJob.progress] = json.dumps(progress)
+    if error is not None:
+        values[BackgroundJob.error] = error
+    db.query(BackgroundJob).filter(BackgroundJob.id == job_id).update(values, synchronize_session=False)
+    db.commit()
+
+
+def to_schema(job: BackgroundJob) -> schemas.Job:
+    return schemas.Job(
+        id=job.id,
+        kind=job.kind,
+        target_id=job.target_id,
+        status=job.status,
+        progress=json.loads(job.progress or "{}"),
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at
+    )
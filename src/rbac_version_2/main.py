@@ -1,9 +1,19 @@
-from fastapi import FastAPI, Depends
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
-from .database import engine, Base
+from .database import engine, replica_set, pool_stats, Base
 from .config import settings
-from .routers import auth, organizations, users, roles, permissions
+from .routers import auth, organizations, users, roles, permissions, rbac
+from . import catalog, org_stats, schemas, signing_keys, singleflight, teardown, token_store
+from .cache import authorization_cache
+from .audit import audit_log
+from .events import event_broadcaster
+from .introspection import token_introspector
+from .middleware import require_permissions
+from .sweeper import sweeper
 
 # Create database tables (only if database is available)
 try:
@@ -13,11 +23,39 @@ except Exception as e:
     print(f"⚠️  Warning: Could not create database tables: {e}")
     print("   The application will start but database operations may fail.")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background maintenance tasks"""
+    if signing_keys.asymmetric_signing():
+        # Fail at startup rather than on the first login if the key directory is unusable
+        signing_keys.get_keyring()
+    try:
+        # Load the revocation list before serving, so revoked tokens are refused from the first request
+        await run_in_threadpool(token_store.revocation_list.sync_now)
+    except Exception as e:
+        print(f"⚠️  Warning: Could not sync token revocation list: {e}")
+    background_tasks = [
+        asyncio.create_task(token_store.revocation_list.run()),
+        asyncio.create_task(sweeper.run()),
+        asyncio.create_task(audit_log.run_flusher()),
+        asyncio.create_task(org_stats.run_refresher()),
+        asyncio.create_task(event_broadcaster.run()),
+        asyncio.create_task(teardown.run_recovery()),
+    ]
+    yield
+    for task in background_tasks:
+        task.cancel()
+    # Write out whatever the audit flusher had not picked up yet
+    audit_log.flush()
+
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     description="A comprehensive RBAC (Role-Based Access Control) system built with FastAPI and PostgreSQL",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -35,6 +73,7 @@ app.include_router(organizations.router, prefix="/api/v1")
 app.include_router(users.router, prefix="/api/v1")
 app.include_router(roles.router, prefix="/api/v1")
 app.include_router(permissions.router, prefix="/api/v1")
+app.include_router(rbac.router, prefix="/api/v1")
 
 
 @app.get("/")
@@ -55,6 +94,36 @@ async def health_check():
         # Test database connection
         with engine.connect() as connection:
             connection.execute(text("SELECT 1")).fetchone()
-        return {"status": "healthy", "database": "connected"}
+        return {"status": "healthy", "database": "connected", "replicas": replica_set.status()}
     except Exception as e:
         return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
+
+
+@app.get("/.well-known/jwks.json")
+async def jwks(request: Request, response: Response):
+    """Public keys for verifying access tokens locally"""
+    if not signing_keys.asymmetric_signing():
+        raise HTTPException(status_code=404, detail="Tokens are signed with a shared secret")
+    keyring = signing_keys.get_keyring()
+    headers = {"ETag": keyring.etag, "Cache-Control": f"public, max-age={settings.jwks_max_age_seconds}"}
+    if catalog.etag_matches(request, keyring.etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return keyring.jwks()
+
+
+@app.get("/metrics")
+async def metrics(current_user: schemas.Principal = Depends(require_permissions(["read_metrics"]))):
+    """Runtime metrics for capacity planning (requires read_metrics)"""
+    return {
+        "cache": authorization_cache.stats(),
+        "audit": audit_log.stats(),
+        "events": event_broadcaster.stats(),
+        "introspection": token_introspector.stats(),
+        "sweeper": sweeper.stats(),
+        "singleflight": singleflight.stats(),
+        "database": {
+            "primary": pool_stats(engine),
+            "replicas": [pool_stats(replica) for replica in replica_set.engines],
+        },
+    }
@@ -1,32 +1,26 @@
-from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import Depends, HTTPException, Request, status
 from typing import List
-from .database import get_db
-from .models import User, Permission
-from .auth import get_current_user
+from .auth import get_current_principal
+from .policy import policy_engine, MODE_ALL, MODE_ANY
+from .schemas import Principal
+from .audit import audit_log, record_decision
 
 
 def require_permissions(required_permissions: List[str]):
     """
     Middleware decorator to check if the current user has the required permissions
     """
-    def permission_checker(
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
-    ):
-        # Get user's role permissions
-        user_permissions = [perm.name for perm in current_user.role.permissions]
-        
-        # Check if user has all required permissions
-        for permission in required_permissions:
-            if permission not in user_permissions:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail=f"Permission '{permission}' required"
-                )
-        
+    def permission_checker(request: Request, current_user: Principal = Depends(get_current_principal)):
+        decision = policy_engine.authorize(current_user, required_permissions, MODE_ALL)
+        record_decision(decision, method=request.method, path=request.url.path)
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Permission '{decision.missing[0]}' required"
+            )
+
         return current_user
-    
+
     return permission_checker
 
 
@@ -34,23 +28,17 @@ def require_any_permission(required_permissions: List[str]):
     """
     Middleware decorator to check if the current user has at least one of the required permissions
     """
-    def permission_checker(
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
-    ):
-        # Get user's role permissions
-        user_permissions = [perm.name for perm in current_user.role.permissions]
-        
-        # Check if user has at least one required permission
-        for permission in required_permissions:
-            if permission in user_permissions:
-                return current_user
-        
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"At least one of these permissions required: {', '.join(required_permissions)}"
-        )
-    
+    def permission_checker(request: Request, current_user: Principal = Depends(get_current_principal)):
+        decision = policy_engine.authorize(current_user, required_permissions, MODE_ANY)
+        record_decision(decision, method=request.method, path=request.url.path)
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"At least one of these permissions required: {', '.join(required_permissions)}"
+            )
+
+        return current_user
+
     return permission_checker
 
 
@@ -58,16 +46,19 @@ def require_role(required_roles: List[str]):
     """
     Middleware decorator to check if the current user has one of the required roles
     """
-    def role_checker(
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
-    ):
-        if current_user.role.name not in required_roles:
+    def role_checker(request: Request, current_user: Principal = Depends(get_current_principal)):
+        grants = policy_engine.role(current_user.role_id)
+        role_name = grants.name if grants else None
+        if role_name not in required_roles:
+            audit_log.record(
+                "authorization.denied", roles=required_roles, role=role_name,
+                method=request.method, path=request.url.path
+            )
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Role '{current_user.role.name}' not authorized. Required roles: {', '.join(required_roles)}"
+                detail=f"Role '{role_name}' not authorized. Required roles: {', '.join(required_roles)}"
             )
-        
+
         return current_user
-    
+
     return role_checker
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table, Text, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Table, Text, Boolean, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from .database import Base
 
 # Association table for role_permissions
@@ -16,8 +16,10 @@ class Organization(Base):
     __tablename__ = "organizations"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), nullable=False)
+    name = Column(String(255), unique=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Incremented whenever the grants of any of its roles change, see crud._bump_permissions_versions
+    permissions_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationships
     users = relationship("User", back_populates="organization")
@@ -26,6 +28,22 @@ class Organization(Base):
 
 class User(Base):
     __tablename__ = "rbac_users"  # Changed table name to avoid conflict
+    __table_args__ = (
+        Index("ix_rbac_users_organization_id_id", "organization_id", "id"),
+        # Prefix search (LIKE 'abc%') within an organization, see crud.search_users
+        Index("ix_rbac_users_organization_id_first_name_prefix", "organization_id",
+              func.lower(text("first_name")).label("first_name_lower"),
+              postgresql_ops={"first_name_lower": "text_pattern_ops"}),
+        Index("ix_rbac_users_organization_id_last_name_prefix", "organization_id",
+              func.lower(text("last_name")).label("last_name_lower"),
+              postgresql_ops={"last_name_lower": "text_pattern_ops"}),
+        Index("ix_rbac_users_organization_id_email_prefix", "organization_id",
+              func.lower(text("email")).label("email_lower"),
+              postgresql_ops={"email_lower": "text_pattern_ops"}),
+        # Only covers unverified accounts, which the sweeper purges by age
+        Index("ix_rbac_users_unverified_created_at", "created_at",
+              postgresql_where=text("NOT is_email_verified"), sqlite_where=text("NOT is_email_verified")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
@@ -35,10 +53,6 @@ class User(Base):
     hashed_password = Column(String(255), nullable=False)
     role_id = Column(Integer, ForeignKey("roles.id"), nullable=False)
     is_email_verified = Column(Boolean, default=False, nullable=False)
-    email_verification_code = Column(String(6), nullable=True)
-    email_verification_expires = Column(DateTime(timezone=True), nullable=True)
-    password_reset_code = Column(String(6), nullable=True)
-    password_reset_expires = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
@@ -48,11 +62,17 @@ class User(Base):
 
 class Role(Base):
     __tablename__ = "roles"
+    __table_args__ = (
+        Index("ix_roles_organization_id_id", "organization_id", "id"),
+        UniqueConstraint("organization_id", "name", name="uq_roles_organization_id_name"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Incremented whenever the role's grants change, see crud._bump_permissions_versions
+    permissions_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationships
     organization = relationship("Organization", back_populates="roles")
@@ -69,3 +89,87 @@ class Permission(Base):
 
     # Relationships
     roles = relationship("Role", secondary=role_permissions, back_populates="permissions")
+
+
+class OneTimeCode(Base):
+    __tablename__ = "one_time_codes"
+    __table_args__ = (UniqueConstraint("user_id", "purpose"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("rbac_users.id"), nullable=False)
+    purpose = Column(String(32), nullable=False)
+    code = Column(String(6), nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    expires_at = Column(DateTime(timezone=True), index=True, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    jti = Column(String(36), primary_key=True)
+    family_id = Column(String(36), index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("rbac_users.id"), index=True, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    replaced_by = Column(String(36), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    # Holds both access-token jtis and refresh-token family ids
+    jti = Column(String(36), primary_key=True)
+    expires_at = Column(DateTime(timezone=True), index=True, nullable=False)
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), index=True, nullable=False)
+
+
+class CatalogVersion(Base):
+    __tablename__ = "catalog_versions"
+
+    # "global" for the permission catalog, "organization:<id>" for an organization's roles
+    scope = Column(String(64), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+
+class BackgroundJob(Base):
+    __tablename__ = "background_jobs"
+
+    id = Column(String(36), primary_key=True)
+    kind = Column(String(64), nullable=False)
+    target_id = Column(Integer, index=True, nullable=True)
+    status = Column(String(16), nullable=False, default="pending")
+    progress = Column(Text, nullable=True)  # JSON
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class AuditEvent(Base):
+    __tablename__ = "audit_log"
+
+    # Append-only; rows are written in batches by audit.AuditLog
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    occurred_at = Column(DateTime(timezone=True), index=True, nullable=False)
+    actor_id = Column(Integer, nullable=True)
+    actor_email = Column(String(255), nullable=True)
+    organization_id = Column(Integer, index=True, nullable=True)
+    action = Column(String(64), index=True, nullable=False)
+    target_type = Column(String(32), nullable=True)
+    target_id = Column(Integer, nullable=True)
+    detail = Column(Text, nullable=True)  # JSON
+
+
+class RBACEvent(Base):
+    __tablename__ = "rbac_events"
+
+    # Transactional outbox: written by crud in the same transaction as the change it
+    # describes; the id is the event's sequence number
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    occurred_at = Column(DateTime(timezone=True), index=True, nullable=False)
+    organization_id = Column(Integer, index=True, nullable=True)  # NULL for catalog-wide events
+    event_type = Column(String(64), nullable=False)
+    resource_type = Column(String(32), nullable=False)
+    resource_id = Column(Integer, nullable=True)
+    data = Column(Text, nullable=True)  # JSON
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from .config import settings
+from .models import OneTimeCode
+
+EMAIL_VERIFICATION = "email_verification"
+PASSWORD_RESET = "password_reset"
+
+# Error message wording per purpose, matching the existing API responses
+_LABELS = {
+    EMAIL_VERIFICATION: "verification code",
+    PASSWORD_RESET: "reset code",
+}
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def issue_code(db: Session, user_id: int, purpose: str, code: str, ttl: Optional[timedelta] = None) -> OneTimeCode:
+    """Store a new code for the user, replacing any previous one for the same purpose (caller commits)"""
+    if ttl is None:
+        ttl = timedelta(minutes=settings.one_time_code_ttl_minutes)
+
+    db.query(OneTimeCode).filter(
+        OneTimeCode.user_id == user_id,
+        OneTimeCode.purpose == purpose
+    ).delete(synchronize_session=False)
+
+    db_code = OneTimeCode(
+        user_id=user_id,
+        purpose=purpose,
+        code=code,
+        attempts=0,
+        expires_at=datetime.now(timezone.utc) + ttl
+    )
+    db.add(db_code)
+    return db_code
+
+
+def check_code(db: Session, user_id: int, purpose: str, code: str, consume: bool = False) -> None:
+    """
+    Validate a code, raising HTTPException on failure. Wrong guesses count
+    against the attempt limit; the code is deleted once the limit is reached.
+    With consume=True a valid code is deleted (caller commits).
+    """
+    label = _LABELS[purpose]
+    # The row lock serializes concurrent guesses for the same code (PostgreSQL)
+    db_code = db.query(OneTimeCode).filter(
+        OneTimeCode.user_id == user_id,
+        OneTimeCode.purpose == purpose
+    ).with_for_update().first()
+
+    if not db_code:
+        raise HTTPException(status_code=400, detail=f"No {label} found")
+
+    if _as_utc(db_code.expires_at) < datetime.now(timezone.utc):
+        db.delete(db_code)
+        db.commit()
+        raise HTTPException(status_code=400, detail=f"{label.capitalize()} expired")
+
+    if db_code.attempts >= settings.one_time_code_max_attempts:
+        db.delete(db_code)
+        db.commit()
+        raise HTTPException(status_code=400, detail=f"Too many invalid attempts, request a new {label}")
+
+    if db_code.code != code:
+        # Incremented in SQL, so concurrent wrong guesses are all counted even without the lock
+        attempts = db.execute(
+            update(OneTimeCode).where(OneTimeCode.id == db_code.id)
+            .values(attempts=OneTimeCode.attempts + 1).returning(OneTimeCode.attempts)
+        ).scalar()
+        if attempts is None or attempts >= settings.one_time_code_max_attempts:
+            # None: a concurrent request already deleted the code
+            db.query(OneTimeCode).filter(OneTimeCode.id == db_code.id).delete(synchronize_session=False)
+            db.commit()
+            raise HTTPException(status_code=400, detail=f"Too many invalid attempts, request a new {label}")
+        db.commit()
+        raise HTTPException(status_code=400, detail=f"Invalid {label}")
+
+    if consume:
+        db.delete(db_code)
+
+
+def delete_expired_codes(db: Session, batch_size: int) -> int:
+    """Delete up to batch_size expired codes in one transaction, returning the number removed"""
+    expired_ids = [
+        row.id for row in db.query(OneTimeCode.id)
+        .filter(OneTimeCode.expires_at < datetime.now(timezone.utc))
+        .limit(batch_size)
+    ]
+    if expired_ids:
+        db.query(OneTimeCode).filter(OneTimeCode.id.in_(expired_ids)).delete(synchronize_session=False)
+        db.commit()
+    return len(expired_ids)
@@ -0,0 +1,214 @@
+"""
+Organization statistics for dashboards.
+
+Everything user-derived is folded from a single grouped aggregate, user
+counts per (role, verified, signup day). It is computed live from rbac_users,
+or on PostgreSQL read from the organization_user_stats materialized view,
+which a background task refreshes every ORGANIZATION_STATS_REFRESH_SECONDS.
+Tenants below ORGANIZATION_STATS_LIVE_MAX_USERS are always computed live, so
+only large tenants see view staleness.
+"""
+
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import column, func, table, text
+from sqlalchemy.orm import Session
+from .config import settings
+from .database import engine
+from .models import Permission, Role, User, role_permissions
+
+LIVE = "live"
+MATERIALIZED = "materialized"
+
+PERIODS = ("day", "week", "month")
+
+STATS_VIEW = "organization_user_stats"
+
+_CREATE_VIEW = f"""
+CREATE MATERIALIZED VIEW IF NOT EXISTS {STATS_VIEW} AS
+SELECT organization_id, role_id, is_email_verified, date(created_at) AS day, count(*) AS users
+FROM rbac_users
+GROUP BY organization_id, role_id, is_email_verified, date(created_at)
+"""
+
+# Required by REFRESH ... CONCURRENTLY, which keeps the view readable while it runs
+_CREATE_VIEW_INDEX = f"""
+CREATE UNIQUE INDEX IF NOT EXISTS ux_{STATS_VIEW}
+ON {STATS_VIEW} (organization_id, role_id, is_email_verified, day)
+"""
+
+_stats_view = table(
+    STATS_VIEW,
+    column("organization_id"), column("role_id"), column("is_email_verified"), column("day"), column("users"),
+)
+
+# (role_id, is_email_verified, signup day, user count)
+UserGroup = Tuple[int, bool, date, int]
+
+
+def materialized_view_enabled() -> bool:
+    return settings.organization_stats_source == MATERIALIZED and engine.dialect.name == "postgresql"
+
+
+def _as_date(value) -> date:
+    # SQLite returns date() results as ISO strings
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _user_groups_live(db: Session, organization_id: int) -> List[UserGroup]:
+    day = func.date(User.created_at)
+    rows = db.query(User.role_id, User.is_email_verified, day, func.count()).filter(
+        User.organization_id == organization_id
+    ).group_by(User.role_id, User.is_email_verified, day)
+    return [(role_id, bool(verified), _as_date(signup_day), count) for role_id, verified, signup_day, count in rows]
+
+
+def _user_groups_materialized(db: Session, organization_id: int) -> List[UserGroup]:
+    rows = db.query(
+        _stats_view.c.role_id, _stats_view.c.is_email_verified, _stats_view.c.day, _stats_view.c.users
+    ).filter(_stats_view.c.organization_id == organization_id)
+    return [(role_id, bool(verified), _as_date(signup_day), count) for role_id, verified, signup_day, count in rows]
+
+
+def _period_start(day: date, period: str) -> date:
+    if period == "day":
+        return day
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _previous_period_start(start: date, period: str) -> date:
+    if period == "day":
+        return start - timedelta(days=1)
+    if period == "week":
+        return start - timedelta(days=7)
+    return (start - timedelta(days=1)).replace(day=1)
+
+
+def _growth(groups: Iterable[UserGroup], period: str, periods: int, today: date) -> List[dict]:
+    starts = [_period_start(today, period)]
+    while len(starts) < periods:
+        starts.append(_previous_period_start(starts[-1], period))
+    starts.reverse()
+
+    new_users: Dict[date, int] = dict.fromkeys(starts, 0)
+    before_window = 0
+    for _, _, day, count in groups:
+        start = _period_start(day, period)
+        if start in new_users:
+            new_users[start] += count
+        elif start < starts[0]:
+            before_window += count
+
+    buckets, running_total = [], before_window
+    for start in starts:
+        running_total += new_users[start]
+        buckets.append({"start": start, "new_users": new_users[start], "total_users": running_total})
+    return buckets
+
+
+def _permission_coverage(db: Session, organization_id: int, users_per_role: Dict[int, int]) -> dict:
+    catalog = db.query(Permission.id, Permission.name).order_by(Permission.name).all()
+    grants = db.query(role_permissions.c.permission_id, role_permissions.c.role_id).join(
+        Role, Role.id == role_permissions.c.role_id
+    ).filter(Role.organization_id == organization_id).all()
+
+    roles_by_permission: Dict[int, List[int]] = {}
+    for permission_id, role_id in grants:
+        roles_by_permission.setdefault(permission_id, []).append(role_id)
+    items = [
+        {
+            "permission_id": permission_id,
+            "name": name,
+            "roles": len(roles_by_permission.get(permission_id, ())),
+            "users": sum(users_per_role.get(role_id, 0) for role_id in roles_by_permission.get(permission_id, ())),
+        }
+        for permission_id, name in catalog
+    ]
+    granted = sum(1 for item in items if item["roles"])
+    return {
+        "catalog_size": len(catalog),
+        "granted": granted,
+        "coverage": round(granted / len(catalog), 4) if catalog else 0.0,
+        "items": items,
+    }
+
+
+def organization_stats(db: Session, organization_id: int, period: str = "month", periods: int = 12) -> dict:
+    """Aggregate user, role, permission and growth statistics for one organization"""
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of: {', '.join(PERIODS)}")
+
+    source = LIVE
+    groups: Optional[List[UserGroup]] = None
+    if materialized_view_enabled():
+        try:
+            groups = _user_groups_materialized(db, organization_id)
+        except Exception as e:
+            # The view is created by the refresher task; fall back until it exists
+            print(f"⚠️  Warning: Could not read {STATS_VIEW}: {e}")
+            db.rollback()
+        if groups is not None and sum(group[3] for group in groups) >= settings.organization_stats_live_max_users:
+            source = MATERIALIZED
+        else:
+            groups = None
+    if groups is None:
+        groups = _user_groups_live(db, organization_id)
+
+    users_per_role: Dict[int, int] = {}
+    verified = total = 0
+    for role_id, is_verified, _, count in groups:
+        users_per_role[role_id] = users_per_role.get(role_id, 0) + count
+        total += count
+        if is_verified:
+            verified += count
+
+    roles = db.query(Role.id, Role.name).filter(Role.organization_id == organization_id).order_by(Role.id).all()
+    return {
+        "organization_id": organization_id,
+        "source": source,
+        "generated_at": datetime.now(timezone.utc),
+        "users": {"total": total, "verified": verified, "unverified": total - verified},
+        "roles": [{"role_id": role_id, "name": name, "users": users_per_role.get(role_id, 0)} for role_id, name in roles],
+        "permissions": _permission_coverage(db, organization_id, users_per_role),
+        "growth": {
+            "period": period,
+            "buckets": _growth(groups, period, periods, datetime.now(timezone.utc).date()),
+        },
+    }
+
+
+def ensure_materialized_view() -> None:
+    with engine.begin() as connection:
+        connection.execute(text(_CREATE_VIEW))
+        connection.execute(text(_CREATE_VIEW_INDEX))
+
+
+def refresh_materialized_view() -> None:
+    with engine.begin() as connection:
+        connection.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {STATS_VIEW}"))
+
+
+async def run_refresher(interval: int = settings.organization_stats_refresh_seconds) -> None:
+    """Create the statistics view if needed, then refresh it periodically"""
+    if not materialized_view_enabled():
+        return
+    try:
+        await run_in_threadpool(ensure_materialized_view)
+    except Exception as e:
+        print(f"⚠️  Warning: Could not create {STATS_VIEW}: {e}")
+        return
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(refresh_materialized_view)
+        except Exception as e:
+            print(f"⚠️  Warning: Refreshing {STATS_VIEW} failed: {e}")
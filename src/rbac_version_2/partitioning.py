@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Optional PostgreSQL migration that partitions rbac_users and roles by
+organization_id, so tenant-scoped queries only touch their tenant's partition.
+
+    hash  spread tenants over N partitions (MODULUS N)
+    list  give the named (large) tenants their own partition, everyone else
+          shares a DEFAULT partition
+
+The migration rebuilds each table in one transaction under an ACCESS
+EXCLUSIVE lock, so run it in a maintenance window. Consequences:
+
+- The primary key becomes (id, organization_id); ids still come from the
+  original sequence and stay unique.
+- Foreign keys that point at a partitioned table (role_permissions.role_id,
+  rbac_users.role_id, one_time_codes.user_id, refresh_tokens.user_id) are
+  dropped, since PostgreSQL only allows them against keys that include the
+  partition key. The application already deletes dependents explicitly.
+- Unique indexes must include the partition key, so rbac_users.email
+  uniqueness moves to a rbac_user_emails lookup table kept in sync by a
+  trigger. Duplicate emails still fail with a unique violation.
+- The organization_user_stats materialized view is dropped and recreated by
+  the application on its next start.
+
+Usage:
+    python -m src.rbac_version_2.partitioning hash --partitions 16 > partition.sql
+    python -m src.rbac_version_2.partitioning list --tenants 1 42 --apply
+"""
+
+import argparse
+from typing import List, Optional, Sequence
+
+PARTITIONED_TABLES = ("rbac_users", "roles")
+
+_DROP_REFERENCING_FOREIGN_KEYS = """\
+DO $$
+DECLARE r record;
+BEGIN
+    FOR r IN SELECT conrelid::regclass AS referencing, conname FROM pg_constraint
+             WHERE contype = 'f' AND confrelid = '{table}'::regclass LOOP
+        EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', r.referencing, r.conname);
+    END LOOP;
+END $$;"""
+
+_USER_EMAILS = """\
+CREATE TABLE rbac_user_emails (email varchar(255) PRIMARY KEY, user_id integer NOT NULL);
+INSERT INTO rbac_user_emails (email, user_id) SELECT email, id FROM rbac_users;
+CREATE FUNCTION rbac_user_emails_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM rbac_user_emails WHERE email = OLD.email;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO rbac_user_emails (email, user_id) VALUES (NEW.email, NEW.id);
+    END IF;
+    RETURN NULL;
+END $$;
+CREATE TRIGGER rbac_user_emails_sync AFTER INSERT OR UPDATE OF email OR DELETE ON rbac_users
+    FOR EACH ROW EXECUTE FUNCTION rbac_user_emails_sync();"""
+
+# Indexes recreated on the partitioned tables (the originals go with the old table)
+_INDEXES = {
+    "rbac_users": [
+        "CREATE INDEX ix_rbac_users_organization_id_id ON rbac_users (organization_id, id);",
+        "CREATE INDEX ix_rbac_users_email ON rbac_users (email);",
+        "CREATE INDEX ix_rbac_users_id ON rbac_users (id);",
+        *(
+            f"CREATE INDEX ix_rbac_users_organization_id_{column}_prefix "
+            f"ON rbac_users (organization_id, lower({column}) text_pattern_ops);"
+            for column in ("first_name", "last_name", "email")
+        ),
+        "CREATE INDEX ix_rbac_users_unverified_created_at ON rbac_users (created_at) WHERE NOT is_email_verified;",
+    ],
+    "roles": [
+        "CREATE INDEX ix_roles_organization_id_id ON roles (organization_id, id);",
+        "CREATE INDEX ix_roles_id ON roles (id);",
+        # Includes the partition key, so it stays unique and usable by ON CONFLICT
+        "CREATE UNIQUE INDEX uq_roles_organization_id_name ON roles (organization_id, name);",
+    ],
+}
+
+
+def partition_statements(table: str, partitions: Optional[int] = None,
+                         tenants: Optional[Sequence[int]] = None) -> List[str]:
+    """DDL that rebuilds one table as a hash (partitions=N) or list (tenants=[...]) partitioned table"""
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"Unsupported table: {table}")
+    if (partitions is None) == (tenants is None):
+        raise ValueError("Pass either partitions (hash) or tenants (list)")
+
+    old = f"{table}_unpartitioned"
+    method = "HASH" if partitions is not None else "LIST"
+    statements = [
+        f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE;",
+        # Depends on the old table; org_stats recreates it on the next start
+        *(["DROP MATERIALIZED VIEW IF EXISTS organization_user_stats;"] if table == "rbac_users" else []),
+        _DROP_REFERENCING_FOREIGN_KEYS.format(table=table),
+        f"ALTER TABLE {table} RENAME TO {old};",
+        f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY {method} (organization_id);",
+    ]
+    if partitions is not None:
+        statements += [
+            f"CREATE TABLE {table}_p{remainder} PARTITION OF {table} "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder});"
+            for remainder in range(partitions)
+        ]
+    else:
+        statements += [
+            f"CREATE TABLE {table}_org_{tenant} PARTITION OF {table} FOR VALUES IN ({tenant});"
+            for tenant in tenants
+        ]
+        statements.append(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT;")
+    statements += [
+        f"INSERT INTO {table} SELECT * FROM {old};",
+        f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id;",
+        f"DROP TABLE {old};",
+        # Built after the bulk copy, which is much faster than maintaining them during it
+        f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, organization_id);",
+        f"ALTER TABLE {table} ADD CONSTRAINT {table}_organization_id_fkey "
+        f"FOREIGN KEY (organization_id) REFERENCES organizations (id);",
+        *_INDEXES[table],
+    ]
+    if table == "rbac_users":
+        statements.append(_USER_EMAILS)
+    statements.append(f"ANALYZE {table};")
+    return statements
+
+
+def migration_sql(tables: Sequence[str], partitions: Optional[int] = None,
+                  tenants: Optional[Sequence[int]] = None) -> str:
+    statements = ["BEGIN;"]
+    for table in tables:
+        statements += partition_statements(table, partitions, tenants)
+    statements.append("COMMIT;")
+    return "\n".join(statements) + "\n"
+
+
+def apply(tables: Sequence[str], partitions: Optional[int] = None,
+          tenants: Optional[Sequence[int]] = None) -> None:
+    from sqlalchemy import text
+    from .database import engine
+
+    if engine.dialect.name != "postgresql":
+        raise SystemExit(f"❌ Partitioning requires PostgreSQL, not {engine.dialect.name}")
+    with engine.begin() as connection:
+        for table in tables:
+            already = connection.execute(
+                text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"), {"table": table}
+            ).first()
+            if already:
+                print(f"⚠️  {table} is already partitioned, skipping")
+                continue
+            for statement in partition_statements(table, partitions, tenants):
+                connection.exec_driver_sql(statement)
+            print(f"✅ Partitioned {table} by organization_id")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Partition rbac_users and roles by organization_id (PostgreSQL)")
+    subparsers = parser.add_subparsers(dest="method", required=True)
+    hash_parser = subparsers.add_parser("hash", help="hash-partition into N partitions")
+    hash_parser.add_argument("--partitions", type=int, default=16)
+    list_parser = subparsers.add_parser("list", help="dedicated partitions for the given tenants plus a default")
+    list_parser.add_argument("--tenants", type=int, nargs="+", required=True)
+    for subparser in (hash_parser, list_parser):
+        subparser.add_argument("--tables", nargs="+", choices=PARTITIONED_TABLES, default=list(PARTITIONED_TABLES))
+        subparser.add_argument("--apply", action="store_true", help="run against DATABASE_URL instead of printing SQL")
+    args = parser.parse_args()
+
+    partitions = args.partitions if args.method == "hash" else None
+    tenants = args.tenants if args.method == "list" else None
+    if args.apply:
+        apply(args.tables, partitions, tenants)
+    else:
+        print(migration_sql(args.tables, partitions, tenants), end="")
+
+
+if __name__ == "__main__":
+    main()
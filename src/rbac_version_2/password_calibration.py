@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Measure password hashing time on this host and recommend a cost setting.
+
+Usage:
+    python -m src.rbac_version_2.password_calibration --target-ms 250
+    python -m src.rbac_version_2.password_calibration --scheme pbkdf2_sha256 --target-ms 100
+"""
+
+import argparse
+import statistics
+import time
+from typing import Optional
+from passlib.context import CryptContext
+
+# Schemes whose cost is log2(iterations) versus a plain iteration count
+LOG2_COST_SCHEMES = {"bcrypt": (4, 20)}
+LINEAR_COST_SCHEMES = {"pbkdf2_sha256": 1000, "pbkdf2_sha512": 1000, "sha256_crypt": 1000, "sha512_crypt": 1000}
+
+# (default, minimum) cost per scheme, used when PASSWORD_HASH_ROUNDS is unset or too low
+SCHEME_ROUNDS = {
+    "bcrypt": (12, 10),
+    "pbkdf2_sha256": (600000, 100000),
+    "pbkdf2_sha512": (210000, 50000),
+    "sha256_crypt": (535000, 100000),
+    "sha512_crypt": (656000, 100000),
+}
+
+
+def resolve_rounds(scheme: str, rounds: Optional[int]) -> Optional[int]:
+    """The configured cost, or the scheme's default; rejects a cost below the scheme's minimum"""
+    if scheme not in SCHEME_ROUNDS:
+        return rounds
+    default, minimum = SCHEME_ROUNDS[scheme]
+    if rounds is None:
+        return default
+    if rounds < minimum:
+        raise ValueError(f"PASSWORD_HASH_ROUNDS={rounds} is below the minimum of {minimum} for {scheme}")
+    return rounds
+
+
+def measure(scheme: str, rounds: int, samples: int) -> float:
+    """Median hashing time in milliseconds for the given scheme and cost"""
+    context = CryptContext(schemes=[scheme], **{f"{scheme}__rounds": rounds})
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash("calibration-password")
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(scheme: str, target_ms: float, samples: int = 3) -> tuple:
+    """Return (rounds, measured_ms): the highest cost whose hash time stays within target_ms"""
+    if scheme in LOG2_COST_SCHEMES:
+        low, high = LOG2_COST_SCHEMES[scheme]
+        low = max(low, SCHEME_ROUNDS.get(scheme, (low, low))[1])
+        best = (low, measure(scheme, low, samples))
+        for rounds in range(low + 1, high + 1):
+            elapsed = measure(scheme, rounds, samples)
+            print(f"  {scheme} rounds={rounds}: {elapsed:.1f} ms")
+            if elapsed > target_ms:
+                break
+            best = (rounds, elapsed)
+        return best
+
+    if scheme in LINEAR_COST_SCHEMES:
+        base = LINEAR_COST_SCHEMES[scheme] * 10
+        per_round = measure(scheme, base, samples) / base
+        floor = SCHEME_ROUNDS[scheme][1] if scheme in SCHEME_ROUNDS else LINEAR_COST_SCHEMES[scheme]
+        rounds = max(floor, int(target_ms / per_round))
+        return rounds, measure(scheme, rounds, samples)
+
+    raise ValueError(f"Calibration is not supported for scheme '{scheme}'")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Calibrate password hash cost for a target latency")
+    parser.add_argument("--scheme", default="bcrypt", help="passlib scheme name (default: bcrypt)")
+    parser.add_argument("--target-ms", type=float, default=250, help="target time per hash in milliseconds")
+    parser.add_argument("--samples", type=int, default=3, help="hashes measured per cost setting")
+    args = parser.parse_args()
+
+    print(f"Calibrating {args.scheme} for {args.target_ms:.0f} ms per hash...")
+    rounds, elapsed = calibrate(args.scheme, args.target_ms, args.samples)
+    print(f"\nRecommended settings ({elapsed:.1f} ms per hash, ~{1000 / elapsed:.1f} logins/s per core):")
+    print(f"PASSWORD_HASH_SCHEME={args.scheme}")
+    print(f"PASSWORD_HASH_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Framework-agnostic authorization engine.
+
+The engine keeps an immutable in-memory snapshot of every role's grants and
+answers checks without I/O. The snapshot is refreshed incrementally: the
+catalog_versions counters tell which organizations changed, and only their
+roles are reloaded. Background workers can use it directly:
+
+    from rbac_version_2.policy import authorize
+    decision = authorize(principal, ["manage_users"], mode="any")
+    if decision.allowed: ...
+
+``principal`` is any object with a ``role_id`` attribute, such as
+``schemas.Principal``.
+"""
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Iterable, Optional, Tuple
+from sqlalchemy.orm import Session
+from .cache import authorization_cache
+from .catalog import GLOBAL_SCOPE
+from .config import settings
+from .database import SessionLocal
+from .models import CatalogVersion, Permission, Role, role_permissions
+from .singleflight import SingleFlight
+
+MODE_ALL = "all"
+MODE_ANY = "any"
+
+
+@dataclass(frozen=True)
+class RoleGrants:
+    role_id: int
+    organization_id: int
+    name: str
+    permissions: FrozenSet[str]
+
+
+@dataclass(frozen=True)
+class RBACSnapshot:
+    roles: Dict[int, RoleGrants] = field(default_factory=dict)
+    versions: Dict[str, int] = field(default_factory=dict)
+    loaded_at: float = 0.0
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    mode: str
+    required: Tuple[str, ...]
+    missing: Tuple[str, ...] = ()
+
+
+def _load_roles(db: Session, organization_ids: Optional[Iterable[int]] = None,
+                role_ids: Optional[Iterable[int]] = None) -> Dict[int, RoleGrants]:
+    """Load roles and their permission names with two set-based queries"""
+    roles_query = db.query(Role.id, Role.organization_id, Role.name)
+    grants_query = db.query(role_permissions.c.role_id, Permission.name).join(
+        Permission, Permission.id == role_permissions.c.permission_id
+    )
+    if organization_ids is not None:
+        organization_ids = list(organization_ids)
+        roles_query = roles_query.filter(Role.organization_id.in_(organization_ids))
+        grants_query = grants_query.join(Role, Role.id == role_permissions.c.role_id).filter(
+            Role.organization_id.in_(organization_ids)
+        )
+    if role_ids is not None:
+        role_ids = list(role_ids)
+        roles_query = roles_query.filter(Role.id.in_(role_ids))
+        grants_query = grants_query.filter(role_permissions.c.role_id.in_(role_ids))
+
+    permissions: Dict[int, set] = {}
+    for role_id, permission_name in grants_query:
+        permissions.setdefault(role_id, set()).add(permission_name)
+    return {
+        role_id: RoleGrants(role_id, organization_id, name, frozenset(permissions.get(role_id, ())))
+        for role_id, organization_id, name in roles_query
+    }
+
+
+class PolicyEngine:
+    def __init__(self, session_factory: Callable[[], Session], refresh_interval: float):
+        # Always the primary: a lagging replica would put just-revoked grants back
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self._snapshot = RBACSnapshot()
+        self._loaded = False
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        # Guards snapshot swaps; the generation counts invalidations, so a load that started
+        # before one is discarded instead of putting revoked grants back
+        self._swap_lock = threading.Lock()
+        self._generation = 0
+        # After an invalidation, concurrent checks against the same role share one load
+        self._role_flight = SingleFlight("role", settings.singleflight_timeout_seconds)
+
+    @property
+    def snapshot(self) -> RBACSnapshot:
+        return self._snapshot
+
+    def refresh(self, db: Optional[Session] = None, force: bool = False) -> RBACSnapshot:
+        """Bring the snapshot up to date, reloading only organizations whose version changed"""
+        owns_session = db is None
+        if owns_session:
+            db = self.session_factory()
+        generation = self._generation
+        try:
+            # Versions are read first, so a concurrent change is at worst reloaded twice
+            versions = dict(db.query(CatalogVersion.scope, CatalogVersion.version).all())
+            current = self._snapshot
+
+            if force or not self._loaded or versions.get(GLOBAL_SCOPE) != current.versions.get(GLOBAL_SCOPE):
+                roles = _load_roles(db)
+            else:
+                changed = [
+                    int(scope.split(":", 1)[1]) for scope, version in versions.items()
+                    if scope.startswith("organization:") and current.versions.get(scope) != version
+                ]
+                roles = current.roles
+                if changed:
+                    changed_set = set(changed)
+                    roles = {role_id: grants for role_id, grants in roles.items()
+                             if grants.organization_id not in changed_set}
+                    roles.update(_load_roles(db, organization_ids=changed))
+
+            with self._swap_lock:
+                if self._generation != generation:
+                    # Rows read before an invalidation may hold revoked grants; the next check retries
+                    return self._snapshot
+                self._snapshot = RBACSnapshot(roles, versions, time.time())
+                self._loaded = True
+                self._last_refresh = time.monotonic()
+                return self._snapshot
+        finally:
+            if owns_session:
+                db.close()
+
+    def maybe_refresh(self) -> None:
+        """Refresh if the interval elapsed; only the first load blocks concurrent callers"""
+        if self._loaded and time.monotonic() - self._last_refresh < self.refresh_interval:
+            return
+        if not self._lock.acquire(blocking=not self._loaded):
+            return
+        try:
+            if not self._loaded or time.monotonic() - self._last_refresh >= self.refresh_interval:
+                self.refresh()
+        except Exception as e:
+            print(f"⚠️  Warning: Could not refresh RBAC snapshot: {e}")
+            self._last_refresh = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def invalidate_roles(self, *role_ids: Optional[int]) -> None:
+        """Drop roles from the snapshot so the next check reloads them"""
+        with self._swap_lock:
+            self._generation += 1
+            current = self._snapshot
+            if any(role_id in current.roles for role_id in role_ids):
+                roles = {role_id: grants for role_id, grants in current.roles.items() if role_id not in role_ids}
+                self._snapshot = RBACSnapshot(roles, current.versions, current.loaded_at)
+
+    def role(self, role_id: int) -> Optional[RoleGrants]:
+        """Get a role's grants, loading roles created since the last refresh on demand"""
+        self.maybe_refresh()
+        grants = self._snapshot.roles.get(role_id)
+        if grants is None:
+            generation = self._generation
+            grants = self._load_role(role_id)
+            if grants is not None:
+                with self._swap_lock:
+                    if self._generation == generation:
+                        current = self._snapshot
+                        self._snapshot = RBACSnapshot(
+                            {**current.roles, role_id: grants}, current.versions, current.loaded_at
+                        )
+        return grants
+
+    def _load_role(self, role_id: int) -> Optional[RoleGrants]:
+        found, cached = authorization_cache.get(authorization_cache.GRANTS, str(role_id))
+        if found:
+            return RoleGrants(role_id, cached["organization_id"], cached["name"],
+                              frozenset(cached["permissions"])) if cached else None
+        return self._role_flight.do(role_id, lambda: self._query_role(role_id))
+
+    def _query_role(self, role_id: int) -> Optional[RoleGrants]:
+        generation = authorization_cache.generation(authorization_cache.GRANTS)
+        db = self.session_factory()
+        try:
+            grants = _load_roles(db, role_ids=[role_id]).get(role_id)
+        finally:
+            db.close()
+        authorization_cache.set(authorization_cache.GRANTS, str(role_id), {
+            "organization_id": grants.organization_id,
+            "name": grants.name,
+            "permissions": sorted(grants.permissions),
+        } if grants else None, generation=generation)
+        return grants
+
+    def permissions_of(self, principal) -> Tuple[Optional[RoleGrants], Tuple[str, ...], str]:
+        """Return (role grants, sorted permission names, version) for a principal"""
+        grants = self.role(principal.role_id)
+        permissions = tuple(sorted(grants.permissions)) if grants else ()
+        # Content-addressed, so it changes exactly when the effective grants do
+        material = f"{principal.id}:{principal.role_id}:{grants.name if grants else ''}:{','.join(permissions)}"
+        return grants, permissions, hashlib.sha1(material.encode()).hexdigest()[:20]
+
+    def authorize(self, principal, permissions: Iterable[str], mode: str = MODE_ALL) -> Decision:
+        """Check whether the principal's role grants all (or any) of the permissions"""
+        required = tuple(permissions)
+        grants = self.role(principal.role_id)
+        granted = grants.permissions if grants else frozenset()
+        missing = tuple(permission for permission in required if permission not in granted)
+
+        if mode == MODE_ALL:
+            allowed = not missing
+        elif mode == MODE_ANY:
+            allowed = len(missing) < len(required)
+        else:
+            raise ValueError(f"Unknown authorization mode: {mode}")
+        return Decision(allowed, mode, required, missing)
+
+
+policy_engine = PolicyEngine(SessionLocal, settings.policy_refresh_seconds)
+
+
+def authorize(principal, permissions: Iterable[str], mode: str = MODE_ALL) -> Decision:
+    """Check permissions against the process-wide policy engine"""
+    return policy_engine.authorize(principal, permissions, mode)
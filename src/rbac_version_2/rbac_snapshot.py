@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Compact binary RBAC snapshot for sidecars and gateways.
+
+Layout (little-endian, all sections contiguous):
+
+    header        see HEADER below
+    perm index    permission_count x (u32 string offset, u16 length), sorted by UTF-8 bytes
+    perm strings  UTF-8 permission names
+    roles         role_count x (u32 role_id, u32 organization_id), sorted by role_id
+    bitsets       role_count x bitset_bytes, bit i set = role grants permission i
+    users         user_count x (u32 user_id, u32 role index), sorted by user_id
+
+Readers mmap the file and answer checks with binary searches over the
+sorted arrays, without building per-object Python structures.
+
+Usage:
+    python -m src.rbac_version_2.rbac_snapshot compile rbac.snap [--organization ID]
+    python -m src.rbac_version_2.rbac_snapshot check rbac.snap USER_ID PERMISSION
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from .config import settings
+from .models import Permission, Role, User, role_permissions
+from .singleflight import SingleFlight
+
+MAGIC = b"RBACSNP\x00"
+FORMAT_VERSION = 1
+
+# magic, format version, permission count, role count, bitset bytes,
+# user count, created_at, then offsets of the five sections
+HEADER = struct.Struct("<8sIIIIQQQQQQQ")
+PERMISSION_ENTRY = struct.Struct("<IH")
+PAIR = struct.Struct("<II")
+
+
+def write_snapshot(db: Session, output: BinaryIO, organization_id: Optional[int] = None) -> dict:
+    """Compile the current RBAC state from the database into output, optionally for one organization"""
+    # Sorted by UTF-8 bytes, the order SnapshotReader searches in; database collations may differ
+    permission_rows = sorted(db.query(Permission.id, Permission.name).all(), key=lambda row: row.name.encode())
+    bit_of = {permission_id: bit for bit, (permission_id, _) in enumerate(permission_rows)}
+    bitset_bytes = (len(permission_rows) + 7) // 8
+
+    role_query = db.query(Role.id, Role.organization_id)
+    grant_query = db.query(role_permissions.c.role_id, role_permissions.c.permission_id)
+    user_query = db.query(User.id, User.role_id)
+    if organization_id is not None:
+        role_query = role_query.filter(Role.organization_id == organization_id)
+        grant_query = grant_query.join(Role, Role.id == role_permissions.c.role_id).filter(
+            Role.organization_id == organization_id
+        )
+        user_query = user_query.filter(User.organization_id == organization_id)
+
+    role_rows = role_query.order_by(Role.id).all()
+    index_of = {role_id: index for index, (role_id, _) in enumerate(role_rows)}
+    bitsets = bytearray(bitset_bytes * len(role_rows))
+    for role_id, permission_id in grant_query:
+        if role_id in index_of and permission_id in bit_of:
+            bit = bit_of[permission_id]
+            bitsets[index_of[role_id] * bitset_bytes + bit // 8] |= 1 << (bit % 8)
+
+    users = array("I")
+    for user_id, role_id in user_query.order_by(User.id).yield_per(50000):
+        if role_id in index_of:
+            users.extend((user_id, index_of[role_id]))
+    if users.itemsize != 4:
+        raise RuntimeError("Snapshot compilation requires 32-bit unsigned ints")
+    if sys.byteorder != "little":
+        users.byteswap()
+
+    names = [name.encode() for _, name in permission_rows]
+    permission_index = bytearray()
+    offset = 0
+    for name in names:
+        permission_index += PERMISSION_ENTRY.pack(offset, len(name))
+        offset += len(name)
+    permission_strings = b"".join(names)
+    roles = b"".join(PAIR.pack(role_id, organization_id or 0) for role_id, organization_id in role_rows)
+
+    perm_index_offset = HEADER.size
+    perm_strings_offset = perm_index_offset + len(permission_index)
+    roles_offset = perm_strings_offset + len(permission_strings)
+    bitsets_offset = roles_offset + len(roles)
+    users_offset = bitsets_offset + len(bitsets)
+    user_count = len(users) // 2
+
+    output.write(HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(permission_rows), len(role_rows), bitset_bytes,
+        user_count, int(time.time()),
+        perm_index_offset, perm_strings_offset, roles_offset, bitsets_offset, users_offset
+    ))
+    output.write(permission_index)
+    output.write(permission_strings)
+    output.write(roles)
+    output.write(bitsets)
+    output.write(users.tobytes())
+    return {
+        "permissions": len(permission_rows),
+        "roles": len(role_rows),
+        "users": user_count,
+        "bytes": users_offset + len(users) * users.itemsize,
+    }
+
+
+class SnapshotReader:
+    """Zero-copy reader over a memory-mapped (or in-memory) snapshot"""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        (magic, version, self.permission_count, self.role_count, self.bitset_bytes,
+         self.user_count, self.created_at, self._perm_index, self._perm_strings,
+         self._roles, self._bitsets, self._users) = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not an RBAC snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version {version}")
+
+    @classmethod
+    def open(cls, path: str) -> "SnapshotReader":
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _permission_name(self, index: int) -> bytes:
+        offset, length = PERMISSION_ENTRY.unpack_from(self._buffer, self._perm_index + index * PERMISSION_ENTRY.size)
+        start = self._perm_strings + offset
+        return self._buffer[start:start + length]
+
+    def permission_bit(self, name: str) -> Optional[int]:
+        target = name.encode()
+        low, high = 0, self.permission_count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            current = self._permission_name(middle)
+            if current == target:
+                return middle
+            if current < target:
+                low = middle + 1
+            else:
+                high = middle - 1
+        return None
+
+    def _search_pairs(self, base: int, count: int, key: int) -> Optional[int]:
+        low, high = 0, count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            current = PAIR.unpack_from(self._buffer, base + middle * PAIR.size)[0]
+            if current == key:
+                return middle
+            if current < key:
+                low = middle + 1
+            else:
+                high = middle - 1
+        return None
+
+    def _role_index_for_user(self, user_id: int) -> Optional[int]:
+        position = self._search_pairs(self._users, self.user_count, user_id)
+        if position is None:
+            return None
+        return PAIR.unpack_from(self._buffer, self._users + position * PAIR.size)[1]
+
+    def _role_has_bit(self, role_index: int, bit: int) -> bool:
+        byte = self._buffer[self._bitsets + role_index * self.bitset_bytes + bit // 8]
+        return bool(byte & (1 << (bit % 8)))
+
+    def user_role(self, user_id: int) -> Optional[Tuple[int, int]]:
+        """Return (role_id, organization_id) for a user"""
+        role_index = self._role_index_for_user(user_id)
+        if role_index is None:
+            return None
+        return PAIR.unpack_from(self._buffer, self._roles + role_index * PAIR.size)
+
+    def role_has_permission(self, role_id: int, permission: str) -> bool:
+        role_index = self._search_pairs(self._roles, self.role_count, role_id)
+        bit = self.permission_bit(permission)
+        return role_index is not None and bit is not None and self._role_has_bit(role_index, bit)
+
+    def user_has_permission(self, user_id: int, permission: str) -> bool:
+        role_index = self._role_index_for_user(user_id)
+        bit = self.permission_bit(permission)
+        return role_index is not None and bit is not None and self._role_has_bit(role_index, bit)
+
+    def user_permissions(self, user_id: int) -> List[str]:
+        role_index = self._role_index_for_user(user_id)
+        if role_index is None:
+            return []
+        return [
+            self._permission_name(bit).decode() for bit in range(self.permission_count)
+            if self._role_has_bit(role_index, bit)
+        ]
+
+
+def compile_to_file(db: Session, path: str, organization_id: Optional[int] = None) -> dict:
+    """Write a snapshot atomically, so readers never map a partial file"""
+    # A unique temporary name, so concurrent compiles of the same path never share a file
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or ".", suffix=".tmp", delete=False) as f:
+        try:
+            stats = write_snapshot(db, f, organization_id)
+        except BaseException:
+            os.remove(f.name)
+            raise
+    os.replace(f.name, path)
+    return stats
+
+
+class CachedSnapshot:
+    def __init__(self, path: str, etag: str, stats: dict, compiled_at: float):
+        self.path = path
+        self.etag = etag
+        self.stats = stats
+        self.compiled_at = compiled_at
+
+
+class SnapshotCache:
+    """
+    Per-organization snapshot files served by GET /rbac/snapshot. A file is
+    recompiled once it is older than max_age, so requests stream it from disk
+    instead of compiling the organization each time. Concurrent misses for the
+    same organization compile it once.
+    """
+
+    def __init__(self, directory: str, max_age: float, session_factory: Callable[[], Session]):
+        self.directory = directory
+        self.max_age = max_age
+        self.session_factory = session_factory
+        self._snapshots: Dict[int, CachedSnapshot] = {}
+        self._flight = SingleFlight("rbac_snapshot", timeout=settings.singleflight_timeout_seconds)
+
+    def get(self, organization_id: int) -> CachedSnapshot:
+        """Current snapshot of one organization, compiling it if missing or stale (blocking)"""
+        snapshot = self._snapshots.get(organization_id)
+        if snapshot is not None and time.monotonic() - snapshot.compiled_at < self.max_age:
+            return snapshot
+        return self._flight.do(organization_id, lambda: self._compile(organization_id))
+
+    def _compile(self, organization_id: int) -> CachedSnapshot:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"organization-{organization_id}.snap")
+        db = self.session_factory()
+        try:
+            stats = compile_to_file(db, path, organization_id)
+        finally:
+            db.close()
+        # The header holds the compile time, so only the sections decide whether the content changed
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            f.seek(HEADER.size)
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        snapshot = CachedSnapshot(path, f'"rbac-snapshot-{digest.hexdigest()[:20]}"', stats, time.monotonic())
+        self._snapshots[organization_id] = snapshot
+        return snapshot
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile or query a binary RBAC snapshot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compile_parser = subparsers.add_parser("compile", help="compile a snapshot from the database")
+    compile_parser.add_argument("path")
+    compile_parser.add_argument("--organization", type=int, help="only this organization's roles and users")
+    check_parser = subparsers.add_parser("check", help="check a user's permission in a snapshot")
+    check_parser.add_argument("path")
+    check_parser.add_argument("user_id", type=int)
+    check_parser.add_argument("permission")
+    args = parser.parse_args()
+
+    if args.command == "compile":
+        from .database import SessionLocal
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            stats = compile_to_file(db, args.path, args.organization)
+            print(f"✅ Wrote {args.path}: {stats} in {time.perf_counter() - start:.2f}s")
+        finally:
+            db.close()
+    else:
+        reader = SnapshotReader.open(args.path)
+        allowed = reader.user_has_permission(args.user_id, args.permission)
+        print("allowed" if allowed else "denied")
+        raise SystemExit(0 if allowed else 1)
+
+
+if __name__ == "__main__":
+    main()
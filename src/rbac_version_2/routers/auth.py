@@ -1,11 +1,18 @@
-from datetime import timedelta
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from ..database import get_db
-from ..auth import create_access_token, create_refresh_token, authenticate_user, verify_refresh_token
-from .. import crud, schemas
+from ..auth import (
+    authenticate_user, verify_refresh_token, decode_token, issue_token_pair,
+    rotate_tokens, revoke_tokens, security
+)
 from ..config import settings
+from ..introspection import token_introspector
+from ..middleware import require_permissions
+from ..token_store import RefreshTokenReuseError
+from .. import crud, schemas
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -82,18 +89,7 @@ async def login_for_access_token(
             detail="Email not verified. Please verify your email first."
         )
     
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
-    
-    refresh_token = create_refresh_token(data={"sub": user.email})
-    
-    return {
-        "access_token": access_token, 
-        "token_type": "bearer",
-        "refresh_token": refresh_token
-    }
+    return issue_token_pair(db, user)
 
 
 @router.post("/refresh-token", response_model=schemas.Token)
@@ -101,33 +97,69 @@ async def refresh_access_token(
     refresh_token: str,
     db: Session = Depends(get_db)
 ):
-    """Refresh access token using refresh token"""
-    email = verify_refresh_token(refresh_token)
-    if not email:
+    """Refresh access token using refresh token (the presented refresh token is rotated out)"""
+    payload = verify_refresh_token(refresh_token)
+    if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token"
         )
     
-    user = crud.get_user_by_email(db, email)
+    user = crud.get_user_by_email(db, payload["sub"])
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
     
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
+    try:
+        return rotate_tokens(db, payload, user)
+    except RefreshTokenReuseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e)
+        )
+
+
+@router.post("/logout")
+async def logout(
+    refresh_token: Optional[str] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    """Revoke the current access token and, if given, its refresh token family"""
+    access_payload = decode_token(credentials.credentials)
+    if not access_payload or access_payload.get("type") == "refresh" or not access_payload.get("jti"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    new_refresh_token = create_refresh_token(data={"sub": user.email})
+    refresh_payload = verify_refresh_token(refresh_token) if refresh_token else None
+    if refresh_payload and refresh_payload["sub"] != access_payload.get("sub"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Refresh token does not belong to the current user"
+        )
     
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "refresh_token": new_refresh_token
-    }
+    revoke_tokens(db, access_payload, refresh_payload)
+    return {"message": "Logged out successfully"}
+
+
+@router.post("/introspect", response_model=schemas.TokenIntrospectionResponse, response_model_exclude_none=True)
+async def introspect_tokens(
+    request: schemas.TokenIntrospectionRequest,
+    current_user: schemas.Principal = Depends(require_permissions(["introspect_tokens"]))
+):
+    """Report whether each token is active, and for active ones its subject, role and permissions"""
+    if len(request.tokens) > settings.introspection_max_tokens:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.introspection_max_tokens} tokens per request"
+        )
+    # Cache misses query the primary, so keep them off the event loop
+    return {"results": await run_in_threadpool(token_introspector.introspect, request.tokens)}
 
 
 @router.post("/forgot-password")
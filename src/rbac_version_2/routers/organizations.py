@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List
 from ..database import get_db
-from ..auth import get_current_user
+from ..auth import get_current_principal
 from ..middleware import require_permissions
-from .. import crud, schemas, models
+from ..tenancy import ensure_tenant
+from .. import crud, schemas, models, jobs, teardown, org_stats
 
 router = APIRouter(prefix="/organizations", tags=["organizations"])
 
@@ -13,7 +14,7 @@ router = APIRouter(prefix="/organizations", tags=["organizations"])
 async def create_organization(
     organization: schemas.OrganizationCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(get_current_principal)
 ):
     """Create a new organization"""
     return crud.create_organization(db=db, organization=organization)
@@ -24,43 +25,78 @@ async def read_organizations(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(get_current_principal)
 ):
-    """Get all organizations"""
-    organizations = crud.get_organizations(db, skip=skip, limit=limit)
+    """Get the organizations visible to the caller (their own)"""
+    organizations = crud.get_organizations(db, skip=skip, limit=limit, organization_id=current_user.organization_id)
     return organizations
 
 
+@router.get("/jobs/{job_id}", response_model=schemas.Job)
+async def read_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(require_permissions(["manage_organizations"]))
+):
+    """Get the status and progress of an organization background job"""
+    job = jobs.get_job(db, job_id)
+    if job is None or (job.kind == teardown.ORGANIZATION_TEARDOWN and job.target_id != current_user.organization_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return jobs.to_schema(job)
+
+
 @router.get("/{organization_id}", response_model=schemas.Organization)
 async def read_organization(
     organization_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.Principal = Depends(get_current_principal)
 ):
     """Get a specific organization"""
+    ensure_tenant(current_user, organization_id)
     organization = crud.get_organization(db, organization_id=organization_id)
     if organization is None:
         raise HTTPException(status_code=404, detail="Organization not found")
     return organization
 
 
+@router.get("/{organization_id}/stats", response_model=schemas.OrganizationStats)
+async def read_organization_stats(
+    organization_id: int,
+    period: str = "month",
+    periods: int = Query(12, ge=1, le=366),
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(require_permissions(["view_organizations"]))
+):
+    """User, role, permission coverage and growth statistics (period: day, week or month)"""
+    ensure_tenant(current_user, organization_id)
+    if crud.get_organization(db, organization_id=organization_id) is None:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    return org_stats.organization_stats(db, organization_id, period=period, periods=periods)
+
+
 @router.put("/{organization_id}", response_model=schemas.Organization)
 async def update_organization(
     organization_id: int,
     organization: schemas.OrganizationCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["manage_organizations"]))
+    current_user: schemas.Principal = Depends(require_permissions(["manage_organizations"]))
 ):
     """Update an organization"""
+    ensure_tenant(current_user, organization_id)
     return crud.update_organization(db=db, organization_id=organization_id, organization=organization)
 
 
-@router.delete("/{organization_id}")
+@router.delete("/{organization_id}", status_code=status.HTTP_202_ACCEPTED)
 async def delete_organization(
     organization_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["manage_organizations"]))
+    current_user: schemas.Principal = Depends(require_permissions(["manage_organizations"]))
 ):
-    """Delete an organization"""
-    crud.delete_organization(db=db, organization_id=organization_id)
-    return {"message": "Organization deleted successfully"}
+    """Delete an organization in the background; poll /organizations/jobs/{job_id} for progress"""
+    ensure_tenant(current_user, organization_id)
+    job = crud.delete_organization(db=db, organization_id=organization_id)
+    # The task claims the job atomically, so it runs once however many requests schedule it;
+    # a running job whose worker died is taken over once it stops reporting progress
+    background_tasks.add_task(teardown.teardown_organization, job.id, organization_id)
+    return {"message": "Organization deletion started", "job_id": job.id}
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 from ..database import get_db
 from ..auth import get_current_user
 from ..middleware import require_permissions
-from .. import crud, schemas, models
+from .. import crud, schemas, models, catalog
 
 router = APIRouter(prefix="/permissions", tags=["permissions"])
 
@@ -13,7 +13,7 @@ router = APIRouter(prefix="/permissions", tags=["permissions"])
 async def create_permission(
     permission: schemas.PermissionCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["manage_permissions"]))
+    current_user: schemas.Principal = Depends(require_permissions(["manage_permissions"]))
 ):
     """Create a new permission"""
     return crud.create_permission(db=db, permission=permission)
@@ -21,12 +21,19 @@ async def create_permission(
 
 @router.get("/", response_model=List[schemas.Permission])
 async def read_permissions(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["view_permissions"]))
+    current_user: schemas.Principal = Depends(require_permissions(["view_permissions"]))
 ):
-    """Get all permissions"""
+    """Get all permissions. Supports If-None-Match revalidation against the returned ETag"""
+    etag = catalog.make_etag("permissions", [catalog.GLOBAL_SCOPE], skip, limit, db=db)
+    if catalog.etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    response.headers["ETag"] = etag
     permissions = crud.get_permissions(db, skip=skip, limit=limit)
     return permissions
 
@@ -35,7 +42,7 @@ async def read_permissions(
 async def read_permission(
     permission_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["view_permissions"]))
+    current_user: schemas.Principal = Depends(require_permissions(["view_permissions"]))
 ):
     """Get a specific permission"""
     permission = crud.get_permission(db, permission_id=permission_id)
@@ -49,7 +56,7 @@ async def update_permission(
     permission_id: int,
     permission: schemas.PermissionCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["manage_permissions"]))
+    current_user: schemas.Principal = Depends(require_permissions(["manage_permissions"]))
 ):
     """Update a permission"""
     return crud.update_permission(db=db, permission_id=permission_id, permission=permission)
@@ -59,7 +66,7 @@ async def update_permission(
 async def delete_permission(
     permission_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["manage_permissions"]))
+    current_user: schemas.Principal = Depends(require_permissions(["manage_permissions"]))
 ):
     """Delete a permission"""
     crud.delete_permission(db=db, permission_id=permission_id)
@@ -0,0 +1,55 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from ..config import settings
+from ..database import SessionLocal
+from ..events import event_broadcaster
+from ..middleware import require_permissions
+from ..rbac_snapshot import SnapshotCache
+from .. import catalog, schemas
+
+router = APIRouter(prefix="/rbac", tags=["rbac"])
+
+snapshot_cache = SnapshotCache(settings.rbac_snapshot_dir, settings.rbac_snapshot_max_age_seconds, SessionLocal)
+
+
+@router.get("/snapshot")
+async def download_snapshot(
+    request: Request,
+    current_user: schemas.Principal = Depends(require_permissions(["manage_permissions"]))
+):
+    """Download a compact binary RBAC snapshot of the caller's organization for local authorization decisions"""
+    snapshot = await run_in_threadpool(snapshot_cache.get, current_user.organization_id)
+    if catalog.etag_matches(request, snapshot.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": snapshot.etag})
+    return FileResponse(
+        snapshot.path,
+        media_type="application/octet-stream",
+        filename="rbac.snap",
+        headers={
+            "ETag": snapshot.etag,
+            "X-RBAC-Snapshot-Users": str(snapshot.stats["users"]),
+            "X-RBAC-Snapshot-Roles": str(snapshot.stats["roles"]),
+        }
+    )
+
+
+@router.get("/events")
+async def stream_events(
+    since: Optional[int] = Query(None, ge=0, description="Replay events with a higher sequence number first"),
+    last_event_id: Optional[str] = Header(None),
+    current_user: schemas.Principal = Depends(require_permissions(["view_roles", "view_permissions"]))
+):
+    """Stream role, permission, grant and user-role changes as server-sent events"""
+    if last_event_id is not None:
+        # Sent by EventSource on reconnect; takes precedence over ?since=
+        try:
+            since = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    return StreamingResponse(
+        event_broadcaster.stream(current_user.organization_id, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
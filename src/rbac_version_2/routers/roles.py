@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from ..database import get_db
 from ..auth import get_current_user
+from ..responses import ORJSONResponse
 from ..middleware import require_permissions
-from .. import crud, schemas, models
+from ..tenancy import ensure_tenant
+from .. import crud, schemas, models, fieldsets, catalog
 
 router = APIRouter(prefix="/roles", tags=["roles"])
 
@@ -13,68 +15,117 @@ router = APIRouter(prefix="/roles", tags=["roles"])
 async def create_role(
     role: schemas.RoleCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["manage_roles"]))
+    current_user: schemas.Principal = Depends(require_permissions(["manage_roles"]))
 ):
     """Create a new role"""
+    ensure_tenant(current_user, role.organization_id)
     return crud.create_role(db=db, role=role)
 
 
-@router.get("/", response_model=List[schemas.Role])
+@router.get("/", response_model=List[schemas.RoleSparse], response_model_exclude_unset=True)
 async def read_roles(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["view_roles"]))
+    current_user: schemas.Principal = Depends(require_permissions(["view_roles"]))
 ):
-    """Get all roles"""
-    roles = crud.get_roles(db, skip=skip, limit=limit)
-    return roles
+    """Get all roles in the caller's organization. Use fields= and expand= (permissions) to shape the response"""
+    fieldset = fieldsets.resolve_role_fieldset(fields, expand)
+    if not fieldset.expand:
+        # Flat shapes are built straight from row tuples, skipping response_model validation
+        return ORJSONResponse(crud.get_role_rows(
+            db, fieldset.fields, skip=skip, limit=limit, organization_id=current_user.organization_id
+        ))
+    roles = crud.get_roles(
+        db, skip=skip, limit=limit, options=fieldsets.role_load_options(fieldset),
+        organization_id=current_user.organization_id
+    )
+    return [fieldsets.shape_role(role, fieldset) for role in roles]
 
 
 @router.get("/{role_id}", response_model=schemas.Role)
 async def read_role(
     role_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["view_roles"]))
+    current_user: schemas.Principal = Depends(require_permissions(["view_roles"]))
 ):
     """Get a specific role"""
-    role = crud.get_role(db, role_id=role_id)
+    role = crud.get_role(db, role_id=role_id, organization_id=current_user.organization_id)
     if role is None:
         raise HTTPException(status_code=404, detail="Role not found")
     return role
 
 
+@router.get("/{role_id}/version", response_model=schemas.RoleVersion)
+async def read_role_version(
+    role_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(require_permissions(["view_roles"]))
+):
+    """Get the permissions_version counters of a role and its organization, for cheap cache validation"""
+    version = crud.get_role_version(db, role_id=role_id, organization_id=current_user.organization_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Role not found")
+    return version
+
+
 @router.put("/{role_id}", response_model=schemas.Role)
 async def update_role(
     role_id: int,
     role: schemas.RoleCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["manage_roles"]))
+    current_user: schemas.Principal = Depends(require_permissions(["manage_roles"]))
 ):
     """Update a role"""
-    return crud.update_role(db=db, role_id=role_id, role=role)
+    ensure_tenant(current_user, role.organization_id)
+    return crud.update_role(db=db, role_id=role_id, role=role, organization_id=current_user.organization_id)
 
 
 @router.delete("/{role_id}")
 async def delete_role(
     role_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["manage_roles"]))
+    current_user: schemas.Principal = Depends(require_permissions(["manage_roles"]))
 ):
     """Delete a role"""
-    crud.delete_role(db=db, role_id=role_id)
+    crud.delete_role(db=db, role_id=role_id, organization_id=current_user.organization_id)
     return {"message": "Role deleted successfully"}
 
 
-@router.get("/organization/{organization_id}", response_model=List[schemas.Role])
+@router.get("/organization/{organization_id}", response_model=List[schemas.RoleSparse], response_model_exclude_unset=True)
 async def read_roles_by_organization(
     organization_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["view_roles"]))
+    current_user: schemas.Principal = Depends(require_permissions(["view_roles"]))
 ):
-    """Get all roles in a specific organization"""
-    roles = crud.get_roles_by_organization(db, organization_id=organization_id)
-    return roles
+    """Get all roles in a specific organization. Supports If-None-Match revalidation against the returned ETag"""
+    ensure_tenant(current_user, organization_id)
+    fieldset = fieldsets.resolve_role_fieldset(fields, expand)
+    etag = catalog.make_etag(
+        "roles",
+        [catalog.GLOBAL_SCOPE, catalog.organization_scope(organization_id)],
+        ",".join(fieldset.fields), ",".join(sorted(fieldset.expand)),
+        db=db
+    )
+    if catalog.etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    if not fieldset.expand:
+        return ORJSONResponse(
+            crud.get_role_rows(db, fieldset.fields, limit=None, organization_id=organization_id),
+            headers={"ETag": etag}
+        )
+    response.headers["ETag"] = etag
+    roles = crud.get_roles_by_organization(
+        db, organization_id=organization_id, options=fieldsets.role_load_options(fieldset)
+    )
+    return [fieldsets.shape_role(role, fieldset) for role in roles]
 
 
 @router.post("/{role_id}/permissions/{permission_id}")
@@ -82,10 +133,12 @@ async def assign_permission_to_role(
     role_id: int,
     permission_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["manage_roles"]))
+    current_user: schemas.Principal = Depends(require_permissions(["manage_roles"]))
 ):
     """Assign a permission to a role"""
-    role = crud.assign_permission_to_role(db=db, role_id=role_id, permission_id=permission_id)
+    role = crud.assign_permission_to_role(
+        db=db, role_id=role_id, permission_id=permission_id, organization_id=current_user.organization_id
+    )
     return {"message": "Permission assigned to role successfully", "role": role}
 
 
@@ -94,8 +147,10 @@ async def remove_permission_from_role(
     role_id: int,
     permission_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["manage_roles"]))
+    current_user: schemas.Principal = Depends(require_permissions(["manage_roles"]))
 ):
     """Remove a permission from a role"""
-    role = crud.remove_permission_from_role(db=db, role_id=role_id, permission_id=permission_id)
+    role = crud.remove_permission_from_role(
+        db=db, role_id=role_id, permission_id=permission_id, organization_id=current_user.organization_id
+    )
     return {"message": "Permission removed from role successfully", "role": role}
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from ..database import get_db
-from ..auth import get_current_user
+from ..auth import get_current_user, get_current_principal
+from ..config import settings
+from ..policy import policy_engine
+from ..responses import ORJSONResponse
 from ..middleware import require_permissions, require_any_permission
-from .. import crud, schemas, models
+from ..tenancy import ensure_tenant
+from .. import crud, schemas, models, fieldsets, catalog
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -13,22 +17,36 @@ router = APIRouter(prefix="/users", tags=["users"])
 async def create_user(
     user: schemas.UserCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["manage_users"]))
+    current_user: schemas.Principal = Depends(require_permissions(["manage_users"]))
 ):
-    """Create a new user"""
-    return crud.create_user(db=db, user=user)
+    """Create a new user in the caller's organization"""
+    organization = crud.get_organization(db, current_user.organization_id)
+    if organization is None or user.organization_name != organization.name:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    return crud.create_user(db=db, user=user, organization_id=organization.id)
 
 
-@router.get("/", response_model=List[schemas.User])
+@router.get("/", response_model=List[schemas.UserSparse], response_model_exclude_unset=True)
 async def read_users(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["view_users"]))
+    current_user: schemas.Principal = Depends(require_permissions(["view_users"]))
 ):
-    """Get all users"""
-    users = crud.get_users(db, skip=skip, limit=limit)
-    return users
+    """Get all users in the caller's organization. Use fields= and expand= (organization, role, role.permissions) to shape the response"""
+    fieldset = fieldsets.resolve_user_fieldset(fields, expand)
+    if not fieldset.expand:
+        # Flat shapes are built straight from row tuples, skipping response_model validation
+        return ORJSONResponse(crud.get_user_rows(
+            db, fieldset.fields, skip=skip, limit=limit, organization_id=current_user.organization_id
+        ))
+    users = crud.get_users(
+        db, skip=skip, limit=limit, options=fieldsets.user_load_options(fieldset),
+        organization_id=current_user.organization_id
+    )
+    return [fieldsets.shape_user(user, fieldset) for user in users]
 
 
 @router.get("/me", response_model=schemas.User)
@@ -39,14 +57,57 @@ async def read_users_me(
     return current_user
 
 
+@router.get("/me/permissions", response_model=schemas.MyPermissions)
+async def read_my_permissions(
+    request: Request,
+    response: Response,
+    current_user: schemas.Principal = Depends(get_current_principal)
+):
+    """Get the caller's effective permissions. Supports If-None-Match revalidation against the returned ETag"""
+    grants, permissions, version = policy_engine.permissions_of(current_user)
+    etag = f'"me-permissions-{version}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={settings.me_permissions_max_age_seconds}, must-revalidate",
+        "Vary": "Authorization",
+    }
+    if catalog.etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    response.headers.update(headers)
+    return {
+        "user_id": current_user.id,
+        "organization_id": current_user.organization_id,
+        "role_id": current_user.role_id,
+        "role": grants.name if grants else None,
+        "permissions": list(permissions),
+        "version": version,
+    }
+
+
+@router.get("/search", response_model=schemas.UserSearchPage)
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=255),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(require_permissions(["view_users"]))
+):
+    """Search users in the caller's organization by email or name prefix. Pass next_cursor back as cursor= for the next page"""
+    items, next_cursor = crud.search_users(
+        db, organization_id=current_user.organization_id, q=q, limit=limit, cursor=cursor
+    )
+    return {"items": items, "next_cursor": next_cursor}
+
+
 @router.get("/{user_id}", response_model=schemas.User)
 async def read_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["view_users"]))
+    current_user: schemas.Principal = Depends(require_permissions(["view_users"]))
 ):
     """Get a specific user"""
-    user = crud.get_user(db, user_id=user_id)
+    user = crud.get_user(db, user_id=user_id, organization_id=current_user.organization_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -57,29 +118,39 @@ async def update_user(
     user_id: int,
     user: schemas.UserCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["manage_users"]))
+    current_user: schemas.Principal = Depends(require_permissions(["manage_users"]))
 ):
     """Update a user"""
-    return crud.update_user(db=db, user_id=user_id, user=user)
+    return crud.update_user(db=db, user_id=user_id, user=user, organization_id=current_user.organization_id)
 
 
 @router.delete("/{user_id}")
 async def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["manage_users"]))
+    current_user: schemas.Principal = Depends(require_permissions(["manage_users"]))
 ):
     """Delete a user"""
-    crud.delete_user(db=db, user_id=user_id)
+    crud.delete_user(db=db, user_id=user_id, organization_id=current_user.organization_id)
     return {"message": "User deleted successfully"}
 
 
-@router.get("/organization/{organization_id}", response_model=List[schemas.User])
+@router.get("/organization/{organization_id}", response_model=List[schemas.UserSparse], response_model_exclude_unset=True)
 async def read_users_by_organization(
     organization_id: int,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_permissions(["view_users"]))
+    current_user: schemas.Principal = Depends(require_permissions(["view_users"]))
 ):
     """Get all users in a specific organization"""
-    users = crud.get_users_by_organization(db, organization_id=organization_id)
-    return users
+    ensure_tenant(current_user, organization_id)
+    fieldset = fieldsets.resolve_user_fieldset(fields, expand)
+    if not fieldset.expand:
+        return ORJSONResponse(
+            crud.get_user_rows(db, fieldset.fields, limit=None, organization_id=organization_id)
+        )
+    users = crud.get_users_by_organization(
+        db, organization_id=organization_id, options=fieldsets.user_load_options(fieldset)
+    )
+    return [fieldsets.shape_user(user, fieldset) for user in users]
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, ConfigDict
-from typing import List, Optional
-from datetime import datetime
+from typing import Any, Dict, List, Optional
+from datetime import date, datetime
 
 
 # Base schemas
@@ -51,6 +51,7 @@ class PermissionCreate(PermissionBase):
 class Organization(OrganizationBase):
     id: int
     created_at: datetime
+    permissions_version: int = 0
     
     model_config = ConfigDict(from_attributes=True)
 
@@ -65,6 +66,7 @@ class Role(RoleBase):
     id: int
     organization_id: int
     created_at: datetime
+    permissions_version: int = 0
     permissions: List[Permission] = []
     
     model_config = ConfigDict(from_attributes=True)
@@ -82,6 +84,56 @@ class User(UserBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+# Sparse response schemas (only the requested fields are set)
+class RoleSparse(BaseModel):
+    id: Optional[int] = None
+    name: Optional[str] = None
+    organization_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    permissions_version: Optional[int] = None
+    permissions: Optional[List[Permission]] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class MyPermissions(BaseModel):
+    user_id: int
+    organization_id: int
+    role_id: int
+    role: Optional[str] = None
+    permissions: List[str]
+    version: str
+
+
+class UserSearchHit(BaseModel):
+    id: int
+    first_name: str
+    last_name: str
+    email: EmailStr
+    role_id: int
+    rank: int
+
+
+class UserSearchPage(BaseModel):
+    items: List[UserSearchHit]
+    next_cursor: Optional[str] = None
+
+
+class UserSparse(BaseModel):
+    id: Optional[int] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[EmailStr] = None
+    organization_id: Optional[int] = None
+    role_id: Optional[int] = None
+    is_email_verified: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    organization: Optional[Organization] = None
+    role: Optional[RoleSparse] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
 # Authentication schemas
 class Token(BaseModel):
     access_token: str
@@ -93,6 +145,15 @@ class TokenData(BaseModel):
     email: Optional[str] = None
 
 
+class Principal(BaseModel):
+    """Authenticated caller as seen by authorization checks"""
+    id: int
+    email: str
+    organization_id: int
+    role_id: int
+    is_email_verified: bool
+
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
@@ -130,6 +191,28 @@ class PasswordResetConfirm(BaseModel):
     confirm_password: str
 
 
+class TokenIntrospectionRequest(BaseModel):
+    tokens: List[str]
+
+
+class TokenIntrospection(BaseModel):
+    """Introspection result; inactive tokens carry nothing but active=false"""
+    active: bool
+    sub: Optional[str] = None
+    user_id: Optional[int] = None
+    organization_id: Optional[int] = None
+    role_id: Optional[int] = None
+    role: Optional[str] = None
+    permissions: Optional[List[str]] = None
+    token_type: Optional[str] = None
+    jti: Optional[str] = None
+    exp: Optional[int] = None
+
+
+class TokenIntrospectionResponse(BaseModel):
+    results: List[TokenIntrospection]
+
+
 # Role-Permission schemas
 class RolePermissionCreate(BaseModel):
     role_id: int
@@ -143,3 +226,70 @@ class RolePermissionResponse(BaseModel):
     permission: Permission
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class RoleVersion(BaseModel):
+    role_id: int
+    organization_id: int
+    permissions_version: int
+    organization_permissions_version: int
+
+
+# Organization statistics schemas
+class UserCounts(BaseModel):
+    total: int
+    verified: int
+    unverified: int
+
+
+class RoleUserCount(BaseModel):
+    role_id: int
+    name: str
+    users: int
+
+
+class PermissionCoverageItem(BaseModel):
+    permission_id: int
+    name: str
+    roles: int
+    users: int
+
+
+class PermissionCoverage(BaseModel):
+    catalog_size: int
+    granted: int
+    coverage: float
+    items: List[PermissionCoverageItem]
+
+
+class GrowthBucket(BaseModel):
+    start: date
+    new_users: int
+    total_users: int
+
+
+class Growth(BaseModel):
+    period: str
+    buckets: List[GrowthBucket]
+
+
+class OrganizationStats(BaseModel):
+    organization_id: int
+    source: str
+    generated_at: datetime
+    users: UserCounts
+    roles: List[RoleUserCount]
+    permissions: PermissionCoverage
+    growth: Growth
+
+
+# Background job schemas
+class Job(BaseModel):
+    id: str
+    kind: str
+    target_id: Optional[int] = None
+    status: str
+    progress: Dict[str, Any] = {}
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
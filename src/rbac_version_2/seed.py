@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Seed a database with a production-scale synthetic RBAC dataset.
+
+Generates organizations whose sizes follow a Zipf-like distribution (a few
+huge tenants, a long tail of small ones), a ladder of roles per organization
+with realistic permission grants, and users spread over roles, verification
+states and signup dates. The output is fully determined by --seed.
+
+Rows are written with COPY on PostgreSQL and with batched multi-row INSERTs
+elsewhere. All users share one password hash computed up front, so seeding
+does no per-user hashing.
+
+Usage:
+    python -m src.rbac_version_2.seed --organizations 1000 --roles-per-org 6 --users 2000000
+    python -m src.rbac_version_2.seed --users 10000 --password secret --prefix dev
+"""
+
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Sequence
+from sqlalchemy import insert, select, text
+from sqlalchemy.engine import Connection
+from .auth import get_password_hash
+from .database import Base, SessionLocal, engine
+from .models import Organization, Permission, Role, User, role_permissions
+from . import catalog
+
+BASE_PERMISSIONS = [
+    ("view_users", "View users"),
+    ("manage_users", "Manage users"),
+    ("view_roles", "View roles"),
+    ("manage_roles", "Manage roles"),
+    ("view_permissions", "View permissions"),
+    ("manage_permissions", "Manage permissions"),
+    ("manage_organizations", "Manage organizations"),
+    ("view_organizations", "View organizations"),
+    ("introspect_tokens", "Introspect access tokens"),
+    ("read_metrics", "View runtime metrics"),
+]
+
+# Highest to lowest privilege; "user" is the registration default and always last
+ROLE_LADDER = ["admin", "manager", "editor", "analyst", "support", "auditor", "contributor", "viewer"]
+# Relative share of an organization's users holding each role, by position in the ladder
+ROLE_WEIGHTS = [1, 4, 6, 6, 5, 3, 5, 10]
+DEFAULT_ROLE_WEIGHT = 60
+
+USER_COLUMNS = ["organization_id", "first_name", "last_name", "email", "hashed_password",
+                "role_id", "is_email_verified", "created_at"]
+
+FIRST_NAMES = ["James", "Mary", "Wei", "Fatima", "Carlos", "Aiko", "Olga", "Kwame", "Priya", "Liam",
+               "Sofia", "Mateo", "Noor", "Hiro", "Elena", "Omar", "Grace", "Ivan", "Amara", "Lucas"]
+LAST_NAMES = ["Smith", "Garcia", "Chen", "Khan", "Silva", "Tanaka", "Ivanova", "Mensah", "Patel", "Murphy",
+              "Rossi", "Lopez", "Haddad", "Sato", "Novak", "Ali", "Kim", "Petrov", "Okafor", "Martin"]
+
+
+def role_names(count: int) -> List[str]:
+    if count < 1:
+        raise ValueError("Every organization needs at least the default role")
+    ladder = ROLE_LADDER[:count - 1]
+    ladder += [f"custom_{i}" for i in range(count - 1 - len(ladder))]
+    return ladder + ["user"]
+
+
+def role_weights(names: Sequence[str]) -> List[int]:
+    weights = [ROLE_WEIGHTS[i] if i < len(ROLE_WEIGHTS) else 2 for i in range(len(names) - 1)]
+    return weights + [DEFAULT_ROLE_WEIGHT]
+
+
+def granted_permissions(rng: random.Random, rank: int, role_count: int, permissions: Sequence[str]) -> List[str]:
+    """Admins get everything, the default role only view_*, roles in between progressively less"""
+    if rank == 0:
+        return list(permissions)
+    if rank == role_count - 1:
+        return [name for name in permissions if name.startswith("view_")]
+    seniority = 1 - rank / max(role_count - 1, 1)
+    granted = []
+    for name in permissions:
+        probability = 0.9 if name.startswith("view_") else 0.1 + 0.6 * seniority
+        if rng.random() < probability:
+            granted.append(name)
+    return granted
+
+
+def ensure_permissions(connection: Connection, extra: int) -> Dict[str, int]:
+    wanted = BASE_PERMISSIONS + [(f"resource_{i}:{action}", f"Synthetic permission {i} ({action})")
+                                 for i in range(extra) for action in ("read", "write")]
+    existing = dict(connection.execute(select(Permission.name, Permission.id)).all())
+    missing = [{"name": name, "description": description} for name, description in wanted if name not in existing]
+    if missing:
+        connection.execute(insert(Permission), missing)
+        existing = dict(connection.execute(select(Permission.name, Permission.id)).all())
+    return {name: existing[name] for name, _ in wanted}
+
+
+def _copy(connection: Connection, table: str, columns: Sequence[str], rows: List[tuple]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def write_users(connection: Connection, rows: List[tuple]) -> None:
+    if connection.dialect.name == "postgresql":
+        _copy(connection, User.__tablename__, USER_COLUMNS, rows)
+    else:
+        connection.execute(insert(User), [dict(zip(USER_COLUMNS, row)) for row in rows])
+
+
+def seed(organizations: int, roles_per_org: int, users: int, seed_value: int = 42, password: str = "password123",
+         prefix: str = "seed", extra_permissions: int = 0, skew: float = 1.1, days: int = 730,
+         verified_ratio: float = 0.9, batch_size: int = 50000) -> dict:
+    rng = random.Random(seed_value)
+    # One hash for everyone: hashing millions of passwords would dominate the run
+    hashed_password = get_password_hash(password)
+    names = role_names(roles_per_org)
+    weights = role_weights(names)
+    now = datetime.now(timezone.utc)
+    stats = {"organizations": organizations, "roles": 0, "grants": 0, "users": 0}
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        permission_ids = ensure_permissions(connection, extra_permissions)
+        permission_names = list(permission_ids)
+
+        organization_rows = connection.execute(
+            insert(Organization).returning(Organization.id, sort_by_parameter_order=True),
+            [{"name": f"{prefix}-org-{i:06d}"} for i in range(organizations)]
+        ).all()
+        organization_ids = [row.id for row in organization_rows]
+
+        role_rows = connection.execute(
+            insert(Role).returning(Role.id, sort_by_parameter_order=True),
+            [{"name": name, "organization_id": organization_id}
+             for organization_id in organization_ids for name in names]
+        ).all()
+        roles_of = {
+            organization_id: [row.id for row in role_rows[i * len(names):(i + 1) * len(names)]]
+            for i, organization_id in enumerate(organization_ids)
+        }
+        stats["roles"] = len(role_rows)
+
+        grants = [
+            {"role_id": role_id, "permission_id": permission_ids[name]}
+            for organization_id in organization_ids
+            for rank, role_id in enumerate(roles_of[organization_id])
+            for name in granted_permissions(rng, rank, len(names), permission_names)
+        ]
+        for start in range(0, len(grants), batch_size):
+            connection.execute(insert(role_permissions), grants[start:start + batch_size])
+        stats["grants"] = len(grants)
+
+    # Zipf-like tenant sizes: organization i gets weight 1 / (i + 1) ** skew
+    cumulative, total = [], 0.0
+    for i in range(organizations):
+        total += 1 / (i + 1) ** skew
+        cumulative.append(total)
+
+    started = time.perf_counter()
+    for start in range(0, users, batch_size):
+        count = min(batch_size, users - start)
+        tenants = rng.choices(organization_ids, cum_weights=cumulative, k=count)
+        rows = []
+        for offset, organization_id in enumerate(tenants):
+            number = start + offset
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            rows.append((
+                organization_id, first_name, last_name,
+                f"{first_name.lower()}.{last_name.lower()}.{number}@{prefix}.example.com",
+                hashed_password,
+                rng.choices(roles_of[organization_id], weights=weights)[0],
+                rng.random() < verified_ratio,
+                now - timedelta(seconds=rng.randint(0, days * 86400)),
+            ))
+        with engine.begin() as connection:
+            write_users(connection, rows)
+        stats["users"] += count
+        elapsed = time.perf_counter() - started
+        print(f"\r  {stats['users']:,}/{users:,} users ({stats['users'] / elapsed:,.0f}/s)", end="", flush=True)
+    print()
+
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as connection:
+            for table in ("organizations", "roles", "role_permissions", "rbac_users"):
+                connection.execute(text(f"ANALYZE {table}"))
+    # Make running servers reload their authorization snapshots
+    db = SessionLocal()
+    try:
+        catalog.bump_versions(db, catalog.GLOBAL_SCOPE)
+        db.commit()
+    finally:
+        db.close()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Seed a large synthetic RBAC dataset")
+    parser.add_argument("--organizations", type=int, default=100)
+    parser.add_argument("--roles-per-org", type=int, default=5)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default="password123", help="password shared by all seeded users")
+    parser.add_argument("--prefix", default="seed", help="organization name and email domain prefix")
+    parser.add_argument("--extra-permissions", type=int, default=0,
+                        help="synthetic resource permissions to add (read and write each)")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for organization sizes")
+    parser.add_argument("--days", type=int, default=730, help="spread signup dates over this many days")
+    parser.add_argument("--verified-ratio", type=float, default=0.9)
+    parser.add_argument("--batch-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = seed(
+        args.organizations, args.roles_per_org, args.users, seed_value=args.seed, password=args.password,
+        prefix=args.prefix, extra_permissions=args.extra_permissions, skew=args.skew, days=args.days,
+        verified_ratio=args.verified_ratio, batch_size=args.batch_size
+    )
+    print(f"✅ Seeded {stats} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Asymmetric JWT signing keys.
+
+With ALGORITHM=RS256 or ES256, tokens are signed with a private key from
+JWT_KEYS_DIR and carry its kid in the header. Every key in the directory is
+published at /.well-known/jwks.json, so other services verify tokens locally.
+
+    <kid>.pem       private key: published and usable for signing
+    <kid>.pub.pem   public key only: a retired key, published until its tokens expire
+
+The signing key is JWT_ACTIVE_KID, or else the newest private key (kids sort
+by creation time). Keys are read once per process; restart workers to rotate.
+
+Usage:
+    python -m src.rbac_version_2.signing_keys generate --alg ES256
+    python -m src.rbac_version_2.signing_keys list
+    python -m src.rbac_version_2.signing_keys retire 20261019120000-a1b2c3
+"""
+
+import argparse
+import hashlib
+import os
+import secrets
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import JWTError, jwk, jwt
+from .config import settings
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+PRIVATE_SUFFIX = ".pem"
+PUBLIC_SUFFIX = ".pub.pem"
+
+
+def algorithm_for(key) -> str:
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return "RS256"
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)) and key.curve.name == "secp256r1":
+        return "ES256"
+    raise ValueError(f"Unsupported key type: {type(key).__name__} (use RSA or EC P-256)")
+
+
+class SigningKey:
+    def __init__(self, kid: str, algorithm: str, public_jwk: Dict[str, Any], private_pem: Optional[bytes] = None):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.public_jwk = dict(public_jwk, kid=kid, use="sig")
+        self.private_pem = private_pem
+
+    @classmethod
+    def from_pem(cls, kid: str, pem: bytes) -> "SigningKey":
+        if b"PRIVATE KEY" in pem:
+            key = serialization.load_pem_private_key(pem, password=None)
+            public_pem = key.public_key().public_bytes(
+                serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+            )
+            private_pem = pem
+        else:
+            key = serialization.load_pem_public_key(pem)
+            public_pem, private_pem = pem, None
+        algorithm = algorithm_for(key)
+        return cls(kid, algorithm, jwk.construct(public_pem, algorithm).to_dict(), private_pem)
+
+
+class Keyring:
+    def __init__(self, keys: List[SigningKey], active_kid: Optional[str] = None):
+        self.keys = {key.kid: key for key in keys}
+        signing = sorted(key.kid for key in keys if key.private_pem is not None)
+        if not signing:
+            raise RuntimeError("No private signing key found")
+        self.active_kid = active_kid or signing[-1]
+        if self.active_kid not in signing:
+            raise RuntimeError(f"Active key {self.active_kid} has no private key")
+        self._jwks = {"keys": [self.keys[kid].public_jwk for kid in sorted(self.keys)]}
+        self.etag = '"jwks-' + hashlib.sha1(",".join(sorted(self.keys)).encode()).hexdigest()[:20] + '"'
+
+    @classmethod
+    def load(cls, directory: str, active_kid: Optional[str] = None) -> "Keyring":
+        keys = []
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(PRIVATE_SUFFIX):
+                continue
+            kid = filename[:-len(PUBLIC_SUFFIX)] if filename.endswith(PUBLIC_SUFFIX) else filename[:-len(PRIVATE_SUFFIX)]
+            with open(os.path.join(directory, filename), "rb") as f:
+                keys.append(SigningKey.from_pem(kid, f.read()))
+        return cls(keys, active_kid)
+
+    def sign(self, claims: Dict[str, Any]) -> str:
+        key = self.keys[self.active_kid]
+        return jwt.encode(claims, key.private_pem.decode(), algorithm=key.algorithm, headers={"kid": key.kid})
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Decode a token signed by any published key; raises JWTError"""
+        key = self.keys.get(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            raise JWTError("Unknown signing key")
+        # The key decides the algorithm, never the token header
+        return jwt.decode(token, key.public_jwk, algorithms=[key.algorithm])
+
+    def jwks(self) -> Dict[str, Any]:
+        return self._jwks
+
+
+_keyring: Optional[Keyring] = None
+_keyring_lock = threading.Lock()
+
+
+def asymmetric_signing() -> bool:
+    return settings.algorithm in ASYMMETRIC_ALGORITHMS
+
+
+def get_keyring() -> Keyring:
+    """Load JWT_KEYS_DIR on first use, so the CLI below works before any key exists"""
+    global _keyring
+    if _keyring is None:
+        with _keyring_lock:
+            if _keyring is None:
+                _keyring = Keyring.load(settings.jwt_keys_dir, settings.jwt_active_kid or None)
+                print(f"✅ Loaded {len(_keyring.keys)} JWT signing keys (active: {_keyring.active_kid})")
+    return _keyring
+
+
+def new_kid() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S") + "-" + secrets.token_hex(3)
+
+
+def generate(directory: str, algorithm: str, kid: Optional[str] = None) -> str:
+    if algorithm == "RS256":
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "ES256":
+        key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    kid = kid or new_kid()
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, kid + PRIVATE_SUFFIX)
+    # Owner-only permissions from the moment the file exists
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(pem)
+    return kid
+
+
+def retire(directory: str, kid: str) -> None:
+    """Replace a private key by its public half: no longer used for signing, still published"""
+    path = os.path.join(directory, kid + PRIVATE_SUFFIX)
+    with open(path, "rb") as f:
+        key = serialization.load_pem_private_key(f.read(), password=None)
+    public_pem = key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    with open(os.path.join(directory, kid + PUBLIC_SUFFIX), "wb") as f:
+        f.write(public_pem)
+    os.remove(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage asymmetric JWT signing keys")
+    parser.add_argument("--dir", default=settings.jwt_keys_dir, help="key directory (default: JWT_KEYS_DIR)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    generate_parser = subparsers.add_parser("generate", help="create a new private key")
+    generate_parser.add_argument("--alg", choices=ASYMMETRIC_ALGORITHMS, default="ES256")
+    generate_parser.add_argument("--kid", help="key id (default: creation timestamp plus random suffix)")
+    subparsers.add_parser("list", help="show published keys and the signing key")
+    retire_parser = subparsers.add_parser("retire", help="stop signing with a key but keep publishing it")
+    retire_parser.add_argument("kid")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        kid = generate(args.dir, args.alg, args.kid)
+        print(f"✅ Generated {args.alg} key {kid} in {args.dir}")
+    elif args.command == "retire":
+        retire(args.dir, args.kid)
+        print(f"✅ Retired key {args.kid}; delete {args.kid}{PUBLIC_SUFFIX} once its tokens have expired")
+    else:
+        keyring = Keyring.load(args.dir, settings.jwt_active_kid or None)
+        for kid, key in sorted(keyring.keys.items()):
+            role = "signing" if kid == keyring.active_kid else ("available" if key.private_pem else "retired")
+            print(f"{kid}  {key.algorithm}  {role}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Request coalescing for cache misses.
+
+When many callers miss the cache for the same key at once, only the first
+(the leader) runs the load; the others wait for its result instead of issuing
+the same query. A follower waits at most the group's timeout and then loads
+on its own, so a stuck leader slows callers down but never fails them. A
+leader's exception is shared with its followers.
+
+Threads and coroutines coalesce separately: ``do`` blocks the calling thread
+and ``do_async`` awaits, so the event loop is never blocked on a thread.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _LeaderAbandoned(Exception):
+    """Set on an async flight whose leader was cancelled before finishing"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self, name: str, timeout: float):
+        self.name = name
+        self.timeout = timeout
+        self._calls: Dict[Hashable, _Call] = {}
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._metrics = {"loads": 0, "coalesced": 0, "timeouts": 0, "errors": 0}
+        _groups.append(self)
+
+    def _incr(self, counter: str) -> None:
+        with self._lock:
+            self._metrics[counter] += 1
+
+    def do(self, key: Hashable, load: Callable[[], T]) -> T:
+        """Run load for key, or wait for a concurrent thread already running it"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if leader:
+            self._incr("loads")
+            try:
+                call.result = load()
+                return call.result
+            except BaseException as e:
+                call.error = e
+                self._incr("errors")
+                raise
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+
+        if not call.done.wait(self.timeout):
+            self._incr("timeouts")
+            return load()
+        self._incr("coalesced")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def do_async(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        """Await load for key, or the result of a coroutine already awaiting it"""
+        future = self._futures.get(key)
+        if future is None:
+            future = self._futures[key] = asyncio.get_running_loop().create_future()
+            self._incr("loads")
+            try:
+                result = await load()
+                future.set_result(result)
+                return result
+            except Exception as e:
+                self._incr("errors")
+                future.set_exception(e)
+                raise
+            except BaseException:
+                future.set_exception(_LeaderAbandoned())
+                raise
+            finally:
+                self._futures.pop(key, None)
+                # Retrieving the exception keeps asyncio from logging it when nobody followed
+                future.exception()
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._incr("timeouts")
+            return await load()
+        except _LeaderAbandoned:
+            return await load()
+        self._incr("coalesced")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._metrics, in_flight=len(self._calls) + len(self._futures))
+
+
+_groups: List[SingleFlight] = []
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Counters of every single-flight group, by name"""
+    return {group.name: group.stats() for group in _groups}
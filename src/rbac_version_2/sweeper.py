@@ -0,0 +1,117 @@
+"""
+Background cleanup of expired and abandoned rows.
+
+Each task deletes at most SWEEPER_BATCH_SIZE rows per transaction, so no
+sweep holds locks for long, and the sweeper pauses between batches to keep
+deletes under SWEEPER_MAX_ROWS_PER_SECOND. Per-task counters are reported
+in /metrics.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from .config import settings
+from .database import SessionLocal
+from . import crud, one_time_codes, token_store
+
+# A task deletes up to batch_size rows in one transaction and returns how many it removed
+SweepTask = Callable[[Session, int], int]
+
+
+class Sweeper:
+    def __init__(self, session_factory: Callable[[], Session], tasks: Dict[str, SweepTask],
+                 batch_size: int, max_rows_per_second: float):
+        self.session_factory = session_factory
+        self.tasks = tasks
+        self.batch_size = batch_size
+        self.max_rows_per_second = max_rows_per_second
+        self._metrics: Dict[str, Dict[str, Any]] = {
+            name: {
+                "runs": 0, "batches": 0, "deleted": 0, "failures": 0, "throttled_seconds": 0.0,
+                "last_deleted": 0, "last_duration_ms": 0.0, "last_run_at": None,
+            }
+            for name in tasks
+        }
+
+    def _run_batch(self, task: SweepTask) -> int:
+        db = self.session_factory()
+        try:
+            return task(db, self.batch_size)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def sweep(self, name: str) -> int:
+        """Run one task until it finds fewer than a full batch, returning the number of rows removed"""
+        metrics = self._metrics[name]
+        started = time.monotonic()
+        deleted = 0
+        try:
+            while True:
+                batch_started = time.monotonic()
+                removed = await run_in_threadpool(self._run_batch, self.tasks[name])
+                deleted += removed
+                metrics["batches"] += 1
+                metrics["deleted"] += removed
+                if removed < self.batch_size:
+                    return deleted
+                if self.max_rows_per_second > 0:
+                    pause = removed / self.max_rows_per_second - (time.monotonic() - batch_started)
+                    if pause > 0:
+                        metrics["throttled_seconds"] += pause
+                        await asyncio.sleep(pause)
+        except Exception:
+            metrics["failures"] += 1
+            raise
+        finally:
+            metrics["runs"] += 1
+            metrics["last_deleted"] = deleted
+            metrics["last_duration_ms"] = round((time.monotonic() - started) * 1000, 3)
+            metrics["last_run_at"] = datetime.now(timezone.utc).isoformat()
+
+    async def run(self, interval: float = settings.sweeper_interval_seconds) -> None:
+        """Run every task, then wait for the next interval"""
+        while True:
+            for name in self.tasks:
+                try:
+                    removed = await self.sweep(name)
+                    if removed:
+                        print(f"🧹 Sweeper removed {removed} rows ({name})")
+                except Exception as e:
+                    print(f"⚠️  Warning: Sweep {name} failed: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: dict(metrics) for name, metrics in self._metrics.items()}
+
+
+def _unverified_accounts_task(max_age_days: int) -> Optional[SweepTask]:
+    if max_age_days <= 0:
+        return None
+    max_age = timedelta(days=max_age_days)
+    return lambda db, batch_size: crud.purge_unverified_users(db, batch_size, max_age)
+
+
+def build_tasks() -> Dict[str, SweepTask]:
+    tasks: Dict[str, SweepTask] = {
+        "one_time_codes": one_time_codes.delete_expired_codes,
+        "refresh_tokens": token_store.delete_expired_refresh_tokens,
+        "revoked_tokens": token_store.delete_expired_revocations,
+    }
+    purge = _unverified_accounts_task(settings.unverified_account_max_age_days)
+    if purge is not None:
+        tasks["unverified_accounts"] = purge
+    return tasks
+
+
+sweeper = Sweeper(
+    SessionLocal,
+    build_tasks(),
+    batch_size=settings.sweeper_batch_size,
+    max_rows_per_second=settings.sweeper_max_rows_per_second,
+)
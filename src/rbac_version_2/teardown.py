@@ -0,0 +1,145 @@
+import asyncio
+import time
+import traceback
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .config import settings
+from .database import SessionLocal
+from .models import OneTimeCode, Organization, RefreshToken, Role, User, role_permissions
+from .cache import authorization_cache
+from .policy import policy_engine
+from . import catalog, events, jobs
+
+ORGANIZATION_TEARDOWN = "organization_teardown"
+
+# Signups are rejected during a teardown, so this only covers one that started just before it
+FINAL_PHASE_ATTEMPTS = 3
+
+
+def _next_ids(db: Session, column, organization_column, organization_id: int, chunk_size: int) -> list:
+    return list(db.scalars(
+        select(column).where(organization_column == organization_id).order_by(column).limit(chunk_size)
+    ))
+
+
+def _delete_users(db: Session, job_id: str, organization_id: int, progress: dict, chunk_size: int, pause: float) -> None:
+    while True:
+        rows = db.execute(
+            select(User.id, User.email).where(User.organization_id == organization_id).order_by(User.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        user_ids = [row.id for row in rows]
+        db.execute(delete(OneTimeCode).where(OneTimeCode.user_id.in_(user_ids)))
+        db.execute(delete(RefreshToken).where(RefreshToken.user_id.in_(user_ids)))
+        db.execute(delete(User).where(User.id.in_(user_ids)))
+        db.commit()
+        # Otherwise deleted users stay authorized until their cached principal expires
+        authorization_cache.invalidate_principals(*(row.email for row in rows))
+        progress["users_deleted"] += len(user_ids)
+        jobs.update_job(db, job_id, progress=progress)
+        time.sleep(pause)
+
+
+def _delete_roles(db: Session, job_id: str, organization_id: int, progress: dict, chunk_size: int, pause: float) -> list:
+    deleted_role_ids = []
+    while True:
+        role_ids = _next_ids(db, Role.id, Role.organization_id, organization_id, chunk_size)
+        if not role_ids:
+            return deleted_role_ids
+        result = db.execute(delete(role_permissions).where(role_permissions.c.role_id.in_(role_ids)))
+        db.execute(delete(Role).where(Role.id.in_(role_ids)))
+        db.commit()
+        deleted_role_ids.extend(role_ids)
+        progress["role_permissions_deleted"] += result.rowcount
+        progress["roles_deleted"] += len(role_ids)
+        jobs.update_job(db, job_id, progress=progress)
+        time.sleep(pause)
+
+
+def teardown_organization(job_id: str, organization_id: int,
+                          chunk_size: int = settings.teardown_chunk_size,
+                          pause: float = settings.teardown_pause_seconds) -> None:
+    """
+    Delete an organization and everything that belongs to it in small,
+    separately committed set-based DELETEs, so no transaction holds row
+    locks on the users or roles tables for long.
+    """
+    db = SessionLocal()
+    try:
+        if not jobs.claim_job(db, job_id, settings.teardown_stale_seconds):
+            # Another worker is running it, or it already finished
+            return
+        progress = {
+            "phase": "counting",
+            "users_total": db.scalar(select(func.count()).select_from(User).where(User.organization_id == organization_id)),
+            "roles_total": db.scalar(select(func.count()).select_from(Role).where(Role.organization_id == organization_id)),
+            "users_deleted": 0,
+            "roles_deleted": 0,
+            "role_permissions_deleted": 0,
+        }
+        jobs.update_job(db, job_id, progress=progress)
+
+        progress["phase"] = "users"
+        _delete_users(db, job_id, organization_id, progress, chunk_size, pause)
+
+        progress["phase"] = "roles"
+        role_ids = _delete_roles(db, job_id, organization_id, progress, chunk_size, pause)
+
+        progress["phase"] = "organization"
+        for attempt in range(FINAL_PHASE_ATTEMPTS):
+            # Catch users, and the default role, that a signup created while the job was running
+            _delete_users(db, job_id, organization_id, progress, chunk_size, pause)
+            role_ids += _delete_roles(db, job_id, organization_id, progress, chunk_size, pause)
+            try:
+                db.execute(delete(Organization).where(Organization.id == organization_id))
+                catalog.bump_versions(db, catalog.organization_scope(organization_id))
+                events.emit(
+                    db, "organization.deleted", "organization", organization_id, organization_id, role_ids=role_ids
+                )
+                db.commit()
+                break
+            except IntegrityError:
+                db.rollback()
+                if attempt == FINAL_PHASE_ATTEMPTS - 1:
+                    raise
+
+        authorization_cache.invalidate_roles(*role_ids)
+        policy_engine.invalidate_roles(*role_ids)
+
+        progress["phase"] = "done"
+        jobs.update_job(db, job_id, status=jobs.COMPLETED, progress=progress)
+        print(f"✅ Organization {organization_id} deleted: {progress}")
+    except Exception as e:
+        print(f"❌ Error tearing down organization {organization_id}: {e}")
+        traceback.print_exc()
+        db.rollback()
+        jobs.update_job(db, job_id, status=jobs.FAILED, error=str(e))
+    finally:
+        db.close()
+
+
+def resume_stale_teardowns(stale_after: float = settings.teardown_stale_seconds) -> int:
+    """Run teardown jobs whose worker crashed or never started them; returns how many were picked up"""
+    db = SessionLocal()
+    try:
+        stale = [(job.id, job.target_id) for job in jobs.find_stale_jobs(db, ORGANIZATION_TEARDOWN, stale_after)]
+    finally:
+        db.close()
+    for job_id, organization_id in stale:
+        print(f"⚠️  Warning: Resuming stale teardown of organization {organization_id} (job {job_id})")
+        # claim_job inside lets only one worker take each job over
+        teardown_organization(job_id, organization_id)
+    return len(stale)
+
+
+async def run_recovery(interval: float = settings.teardown_stale_seconds) -> None:
+    """Pick up stale teardown jobs at startup and then every interval, so no one has to repeat the DELETE"""
+    while True:
+        try:
+            await run_in_threadpool(resume_stale_teardowns)
+        except Exception as e:
+            print(f"⚠️  Warning: Teardown recovery failed: {e}")
+        await asyncio.sleep(interval)
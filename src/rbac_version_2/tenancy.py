@@ -0,0 +1,17 @@
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy.orm import Query
+from .schemas import Principal
+
+
+def scope_query(query: Query, model, organization_id: Optional[int]) -> Query:
+    """Restrict a query to one tenant; None leaves it unscoped (internal callers only)"""
+    if organization_id is None:
+        return query
+    return query.filter(model.organization_id == organization_id)
+
+
+def ensure_tenant(principal: Principal, organization_id: int, detail: str = "Organization not found") -> None:
+    """Reject path parameters that point at another tenant, without revealing that it exists"""
+    if principal.organization_id != organization_id:
+        raise HTTPException(status_code=404, detail=detail)
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from .config import settings
+from .database import SessionLocal
+from .models import RefreshToken, RevokedToken
+
+
+class RefreshTokenReuseError(Exception):
+    """Raised when an already rotated or revoked refresh token is presented again"""
+
+
+def new_jti() -> str:
+    """Generate a unique token identifier"""
+    return str(uuid.uuid4())
+
+
+class RevocationList:
+    """
+    In-memory set of revoked token ids, synced incrementally from the
+    revoked_tokens table by a background task (see run) so that request-time
+    checks never hit the database.
+    """
+
+    # Rows committed slightly out of order are picked up on the next sync
+    SYNC_OVERLAP = timedelta(seconds=5)
+
+    def __init__(self, sync_interval: int):
+        self.sync_interval = sync_interval
+        self._entries: Dict[str, float] = {}
+        self._high_water: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        """Record a revocation locally (e.g. right after writing it to the store)"""
+        self._entries[jti] = expires_at.timestamp()
+
+    def is_revoked(self, *token_ids: Optional[str]) -> bool:
+        """Check whether any of the given token ids (jti, family id) is revoked"""
+        return any(token_id in self._entries for token_id in token_ids if token_id)
+
+    def sync_now(self) -> None:
+        """Sync from the store in a session of its own (blocking)"""
+        with self._lock:
+            db = SessionLocal()
+            try:
+                self.sync(db)
+            finally:
+                db.close()
+
+    async def run(self) -> None:
+        """Sync from the store every sync_interval, off the event loop"""
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await run_in_threadpool(self.sync_now)
+            except Exception as e:
+                print(f"⚠️  Warning: Could not sync token revocation list: {e}")
+
+    def sync(self, db: Session) -> None:
+        """Load revocations recorded since the last sync and drop expired entries"""
+        query = db.query(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at)
+        if self._high_water is not None:
+            query = query.filter(RevokedToken.revoked_at > self._high_water - self.SYNC_OVERLAP)
+        for jti, expires_at, revoked_at in query.all():
+            self.add(jti, _as_utc(expires_at))
+            if self._high_water is None or _as_utc(revoked_at) > self._high_water:
+                self._high_water = _as_utc(revoked_at)
+
+        now = time.time()
+        for jti in [jti for jti, exp in list(self._entries.items()) if exp < now]:
+            self._entries.pop(jti, None)
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+revocation_list = RevocationList(settings.token_revocation_sync_seconds)
+
+
+def store_refresh_token(db: Session, user_id: int, jti: str, family_id: str, expires_at: datetime) -> RefreshToken:
+    """Track a newly issued refresh token (caller commits)"""
+    db_token = RefreshToken(jti=jti, family_id=family_id, user_id=user_id, expires_at=expires_at)
+    db.add(db_token)
+    return db_token
+
+
+def rotate_refresh_token(db: Session, jti: str, new_jti: str, expires_at: datetime) -> RefreshToken:
+    """
+    Mark a refresh token as used and register its successor in the same family.
+    Presenting a token that was already rotated or revoked revokes the whole family.
+    """
+    db_token = db.query(RefreshToken).filter(RefreshToken.jti == jti).with_for_update().first()
+    if db_token is None:
+        raise RefreshTokenReuseError("Unknown refresh token")
+
+    if db_token.revoked_at is not None or db_token.replaced_by is not None:
+        revoke_refresh_family(db, db_token.family_id)
+        db.commit()
+        raise RefreshTokenReuseError("Refresh token reuse detected")
+
+    db_token.revoked_at = datetime.now(timezone.utc)
+    db_token.replaced_by = new_jti
+    return store_refresh_token(db, db_token.user_id, new_jti, db_token.family_id, expires_at)
+
+
+def revoke_refresh_family(db: Session, family_id: str) -> None:
+    """Revoke every refresh token of a family and the access tokens issued from it (caller commits)"""
+    now = datetime.now(timezone.utc)
+    db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: now}, synchronize_session=False)
+
+    # Access tokens carry their family id, so a single entry covers all of them
+    expires_at = now + timedelta(days=settings.refresh_token_expire_days)
+    revoke_token_id(db, family_id, expires_at)
+
+
+def revoke_token_id(db: Session, jti: str, expires_at: datetime) -> None:
+    """Add a token id to the revocation list (caller commits)"""
+    if db.get(RevokedToken, jti) is None:
+        db.add(RevokedToken(jti=jti, expires_at=expires_at))
+    revocation_list.add(jti, expires_at)
+
+
+def delete_expired_refresh_tokens(db: Session, batch_size: int) -> int:
+    """Delete up to batch_size refresh token rows past their expiry, returning the number removed"""
+    expired = [
+        row.jti for row in db.query(RefreshToken.jti)
+        .filter(RefreshToken.expires_at < datetime.now(timezone.utc))
+        .limit(batch_size)
+    ]
+    if expired:
+        db.query(RefreshToken).filter(RefreshToken.jti.in_(expired)).delete(synchronize_session=False)
+        db.commit()
+    return len(expired)
+
+
+def delete_expired_revocations(db: Session, batch_size: int) -> int:
+    """Delete up to batch_size revocations whose tokens have expired anyway, returning the number removed"""
+    expired = [
+        row.jti for row in db.query(RevokedToken.jti)
+        .filter(RevokedToken.expires_at < datetime.now(timezone.utc))
+        .limit(batch_size)
+    ]
+    if expired:
+        db.query(RevokedToken).filter(RevokedToken.jti.in_(expired)).delete(synchronize_session=False)
+        db.commit()
+    return len(expired)
@@ -0,0 +1,60 @@
+import os
+import tempfile
+
+# Settings are read at import time, so the database must be chosen first
+_db_dir = tempfile.mkdtemp(prefix="rbac-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+
+import pytest
+from fastapi.testclient import TestClient
+from src.rbac_version_2 import models
+from src.rbac_version_2.auth import get_password_hash
+from src.rbac_version_2.database import SessionLocal
+from src.rbac_version_2.email_service import EmailService
+from src.rbac_version_2.main import app
+
+PASSWORD = "correct horse"
+ADMIN_PERMISSIONS = ("view_users", "manage_users", "view_roles", "manage_roles")
+
+
+@pytest.fixture(autouse=True)
+def no_email(monkeypatch):
+    monkeypatch.setattr(EmailService, "_send_email", lambda self, to, subject, body: True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _permission(db, name):
+    permission = db.query(models.Permission).filter(models.Permission.name == name).first()
+    if permission is None:
+        permission = models.Permission(name=name)
+        db.add(permission)
+    return permission
+
+
+@pytest.fixture
+def make_admin(client):
+    """Create an organization with a verified admin and return (organization name, auth headers)"""
+    def make(organization_name):
+        db = SessionLocal()
+        try:
+            organization = models.Organization(name=organization_name)
+            role = models.Role(name="admin", organization=organization)
+            role.permissions = [_permission(db, name) for name in ADMIN_PERMISSIONS]
+            email = f"admin@{organization_name.lower()}.example.com"
+            db.add(models.User(
+                first_name="Admin", last_name=organization_name, email=email,
+                hashed_password=get_password_hash(PASSWORD), organization=organization,
+                role=role, is_email_verified=True,
+            ))
+            db.commit()
+        finally:
+            db.close()
+        response = client.post("/api/v1/auth/login", data={"username": email, "password": PASSWORD})
+        assert response.status_code == 200, response.text
+        return organization_name, {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return make
@@ -0,0 +1,71 @@
+import time
+import fakeredis
+import pytest
+import redis
+from src.rbac_version_2.cache import AuthorizationCache, CacheBackend, RedisCache
+
+TTL = 0.2
+NEGATIVE_TTL = 0.1
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        redis.Redis, "from_url",
+        lambda url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs)
+    )
+    backend = RedisCache("redis://fake:6379/0")
+    return AuthorizationCache(
+        backend,
+        ttls={AuthorizationCache.PRINCIPAL: TTL, AuthorizationCache.GRANTS: TTL},
+        negative_ttl=NEGATIVE_TTL,
+        prefix="test:",
+    )
+
+
+def test_cache_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+
+def test_round_trip_until_ttl(cache):
+    principal = {"id": 1, "email": "a@example.com", "role_id": 2}
+    cache.set(cache.PRINCIPAL, "a@example.com", principal)
+    assert cache.get(cache.PRINCIPAL, "a@example.com") == (True, principal)
+    assert cache.backend.get("test:principal:a@example.com") is not None
+
+    time.sleep(TTL + 0.1)
+    assert cache.get(cache.PRINCIPAL, "a@example.com") == (False, None)
+
+
+def test_negative_entries_expire_on_their_own_ttl(cache):
+    cache.set(cache.PRINCIPAL, "ghost@example.com", None)
+    assert cache.get(cache.PRINCIPAL, "ghost@example.com") == (True, None)
+
+    time.sleep(NEGATIVE_TTL + 0.05)
+    assert cache.get(cache.PRINCIPAL, "ghost@example.com") == (False, None)
+
+
+def test_invalidation(cache):
+    cache.set(cache.GRANTS, "7", {"permissions": ["view_users"]})
+    cache.set(cache.GRANTS, "8", {"permissions": []})
+    cache.set(cache.PRINCIPAL, "b@example.com", {"id": 2})
+
+    cache.invalidate_roles(7, None)
+    cache.invalidate_principals("b@example.com")
+
+    assert cache.get(cache.GRANTS, "7") == (False, None)
+    assert cache.get(cache.GRANTS, "8") == (True, {"permissions": []})
+    assert cache.get(cache.PRINCIPAL, "b@example.com") == (False, None)
+    stats = cache.stats()
+    assert stats["grants"]["invalidations"] == 1
+    assert stats["principal"]["invalidations"] == 1
+
+
+def test_backend_failures_are_misses(cache, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise redis.ConnectionError("down")
+    monkeypatch.setattr(cache.backend._client, "get", unavailable)
+    assert cache.get(cache.PRINCIPAL, "a@example.com") == (False, None)
+    assert cache.stats()["principal"]["errors"] == 1
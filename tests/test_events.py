@@ -0,0 +1,26 @@
+import json
+from src.rbac_version_2 import crud, models, schemas
+from src.rbac_version_2.database import SessionLocal
+
+
+def test_catalog_wide_permission_events_carry_no_tenant_data(client):
+    db = SessionLocal()
+    try:
+        permission = models.Permission(name="shared_report")
+        for name in ("Events Tenant A", "Events Tenant B"):
+            db.add(models.Role(name="reader", organization=models.Organization(name=name), permissions=[permission]))
+        db.commit()
+        permission_id = permission.id
+
+        crud.update_permission(db, permission_id, schemas.PermissionCreate(name="shared_reports"))
+        crud.delete_permission(db, permission_id)
+
+        rows = db.query(models.RBACEvent).filter(
+            models.RBACEvent.resource_type == "permission", models.RBACEvent.resource_id == permission_id
+        ).all()
+        assert {row.event_type for row in rows} == {"permission.updated", "permission.deleted"}
+        for row in rows:
+            assert row.organization_id is None
+            assert json.loads(row.data) == {"name": "shared_reports"}
+    finally:
+        db.close()
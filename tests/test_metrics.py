@@ -0,0 +1,5 @@
+def test_metrics_require_read_metrics(client, make_admin):
+    assert client.get("/metrics").status_code in (401, 403)
+
+    _, headers = make_admin("Echo")
+    assert client.get("/metrics", headers=headers).status_code == 403
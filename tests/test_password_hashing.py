@@ -0,0 +1,21 @@
+import pytest
+from src.rbac_version_2.auth import build_password_context
+
+
+def test_unset_rounds_use_the_scheme_default():
+    assert build_password_context("pbkdf2_sha256").hash("pw").startswith("$pbkdf2-sha256$600000$")
+    assert build_password_context("bcrypt").hash("pw").startswith("$2b$12$")
+
+
+def test_rounds_below_the_scheme_minimum_are_rejected():
+    with pytest.raises(ValueError):
+        build_password_context("pbkdf2_sha256", 12)
+    with pytest.raises(ValueError):
+        build_password_context("bcrypt", 4)
+
+
+def test_existing_bcrypt_hashes_keep_verifying_under_pbkdf2():
+    bcrypt_hash = build_password_context("bcrypt").hash("pw")
+    context = build_password_context("pbkdf2_sha256")
+    assert context.verify("pw", bcrypt_hash)
+    assert context.needs_update(bcrypt_hash)
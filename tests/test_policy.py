@@ -0,0 +1,44 @@
+from src.rbac_version_2 import policy
+from src.rbac_version_2.cache import authorization_cache
+from src.rbac_version_2.database import SessionLocal
+from src.rbac_version_2.policy import PolicyEngine, RoleGrants
+
+STALE = RoleGrants(role_id=900, organization_id=9, name="admin", permissions=frozenset({"manage_users"}))
+
+
+def test_refresh_racing_an_invalidation_is_discarded(client, monkeypatch):
+    engine = PolicyEngine(SessionLocal, refresh_interval=60)
+    engine.refresh()
+
+    def load_then_invalidate(db, organization_ids=None, role_ids=None):
+        # The grant is revoked after the refresh read its rows but before it swaps them in
+        engine.invalidate_roles(STALE.role_id)
+        return {STALE.role_id: STALE}
+
+    monkeypatch.setattr(policy, "_load_roles", load_then_invalidate)
+    engine.refresh(force=True)
+
+    assert STALE.role_id not in engine.snapshot.roles
+
+
+def test_refresh_without_invalidation_is_applied(client, monkeypatch):
+    engine = PolicyEngine(SessionLocal, refresh_interval=60)
+    monkeypatch.setattr(policy, "_load_roles", lambda db, organization_ids=None, role_ids=None: {STALE.role_id: STALE})
+    engine.refresh(force=True)
+
+    assert engine.snapshot.roles[STALE.role_id] == STALE
+
+
+def test_role_load_racing_an_invalidation_is_not_cached(client, monkeypatch):
+    engine = PolicyEngine(SessionLocal, refresh_interval=60)
+    authorization_cache.invalidate_roles(STALE.role_id)
+
+    def load_then_invalidate(db, organization_ids=None, role_ids=None):
+        authorization_cache.invalidate_roles(STALE.role_id)
+        return {STALE.role_id: STALE}
+
+    monkeypatch.setattr(policy, "_load_roles", load_then_invalidate)
+    assert engine._query_role(STALE.role_id) == STALE
+
+    found, _ = authorization_cache.get(authorization_cache.GRANTS, str(STALE.role_id))
+    assert not found
@@ -0,0 +1,52 @@
+import io
+import re
+from sqlalchemy import event
+from src.rbac_version_2 import models
+from src.rbac_version_2.database import SessionLocal
+from src.rbac_version_2.rbac_snapshot import SnapshotReader, write_snapshot
+
+# Inserted (and returned without ORDER BY) in a linguistic order such as en_US.UTF-8:
+# case-insensitive and ignoring punctuation, unlike the byte order the reader searches in
+COLLATION_ORDERED = ["snap_a.b", "snap_aB", "snap_ab_c", "snap_Ac", "snap_a_d", "snap_Zed"]
+
+
+def _linguistic_key(name):
+    return re.sub(r"[^a-z0-9]", "", name.lower()), name
+
+
+def _linguistic(left, right):
+    return (_linguistic_key(left) > _linguistic_key(right)) - (_linguistic_key(left) < _linguistic_key(right))
+
+
+def _use_linguistic_collation(connection):
+    """Make this SQLite connection order permission names the way a linguistic collation would"""
+    connection.connection.driver_connection.create_collation("linguistic", _linguistic)
+
+    @event.listens_for(connection, "before_cursor_execute", retval=True)
+    def collate(conn, cursor, statement, parameters, context, executemany):
+        return statement.replace("ORDER BY permissions.name", "ORDER BY permissions.name COLLATE linguistic"), parameters
+
+
+def test_permission_lookup_does_not_depend_on_database_collation(client):
+    assert sorted(COLLATION_ORDERED, key=str.encode) != COLLATION_ORDERED
+    db = SessionLocal()
+    try:
+        organization = models.Organization(name="Snapshot Collation")
+        role = models.Role(name="all", organization=organization)
+        role.permissions = [models.Permission(name=name) for name in COLLATION_ORDERED]
+        user = models.User(
+            first_name="S", last_name="C", email="snap@collation.example.com", hashed_password="x",
+            organization=organization, role=role, is_email_verified=True,
+        )
+        db.add(user)
+        db.commit()
+
+        _use_linguistic_collation(db.connection())
+        buffer = io.BytesIO()
+        write_snapshot(db, buffer, organization.id)
+        reader = SnapshotReader(buffer.getvalue())
+        for name in COLLATION_ORDERED:
+            assert reader.user_has_permission(user.id, name), name
+        assert not reader.user_has_permission(user.id, "snap_missing")
+    finally:
+        db.close()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from src.rbac_version_2 import catalog, database, models
+from src.rbac_version_2.database import Base, ReplicaSet, SessionLocal, USE_REPLICA, engine
+
+
+def _lagging_replica():
+    """A separate database standing in for a replica that has not caught up with the primary"""
+    replica = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='rbac-replica-'), 'replica.db')}")
+    Base.metadata.create_all(replica)
+    return replica
+
+
+def test_etag_is_read_from_the_replica_that_serves_the_body(client):
+    db = SessionLocal()
+    try:
+        catalog.bump_versions(db, catalog.GLOBAL_SCOPE)
+        db.commit()
+        primary_version = catalog.read_versions(db, [catalog.GLOBAL_SCOPE])[catalog.GLOBAL_SCOPE]
+    finally:
+        db.close()
+
+    replica = Session(bind=_lagging_replica(), info={USE_REPLICA: True})
+    try:
+        lagging = catalog.make_etag("permissions", [catalog.GLOBAL_SCOPE], 0, 100, db=replica)
+        assert lagging != catalog.make_etag("permissions", [catalog.GLOBAL_SCOPE], 0, 100)
+
+        replica.add(models.CatalogVersion(scope=catalog.GLOBAL_SCOPE, version=primary_version))
+        replica.commit()
+        caught_up = catalog.make_etag("permissions", [catalog.GLOBAL_SCOPE], 0, 100, db=replica)
+        assert caught_up == catalog.make_etag("permissions", [catalog.GLOBAL_SCOPE], 0, 100)
+    finally:
+        replica.close()
+
+
+def test_session_reads_from_one_replica_and_locks_on_the_primary(monkeypatch):
+    replicas = ReplicaSet([create_engine("sqlite://"), create_engine("sqlite://")], retry_seconds=30)
+    monkeypatch.setattr(database, "replica_set", replicas)
+    db = SessionLocal()
+    db.info[USE_REPLICA] = True
+    try:
+        chosen = {db.get_bind(clause=select(models.Role)) for _ in range(4)}
+        assert len(chosen) == 1 and chosen <= set(replicas.engines)
+
+        assert db.get_bind(clause=select(models.Role).with_for_update()) is engine
+        assert db.get_bind(clause=select(models.Role)) is engine
+    finally:
+        db.close()
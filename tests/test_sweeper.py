@@ -0,0 +1,10 @@
+from src.rbac_version_2 import sweeper
+from src.rbac_version_2.config import settings
+
+
+def test_unverified_accounts_are_only_purged_when_enabled(monkeypatch):
+    assert settings.unverified_account_max_age_days == 0
+    assert "unverified_accounts" not in sweeper.build_tasks()
+
+    monkeypatch.setattr(settings, "unverified_account_max_age_days", 7)
+    assert "unverified_accounts" in sweeper.build_tasks()
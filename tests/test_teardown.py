@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta, timezone
+from src.rbac_version_2 import jobs, models, teardown
+from src.rbac_version_2.auth import load_principal
+from src.rbac_version_2.cache import authorization_cache
+from src.rbac_version_2.database import SessionLocal
+
+
+def test_stale_teardown_is_resumed_and_deleted_users_lose_access(client, make_admin):
+    organization_name, _ = make_admin("Crashed Teardown")
+    email = f"admin@{organization_name.lower()}.example.com"
+    assert load_principal(email) is not None
+
+    db = SessionLocal()
+    try:
+        organization_id = db.query(models.Organization.id).filter(models.Organization.name == organization_name).scalar()
+        job = jobs.create_job(db, teardown.ORGANIZATION_TEARDOWN, organization_id)
+        # The worker claimed the job and died an hour ago
+        db.query(models.BackgroundJob).filter(models.BackgroundJob.id == job.id).update({
+            models.BackgroundJob.status: jobs.RUNNING,
+            models.BackgroundJob.updated_at: datetime.now(timezone.utc) - timedelta(hours=1),
+        }, synchronize_session=False)
+        db.commit()
+        job_id = job.id
+    finally:
+        db.close()
+
+    assert teardown.resume_stale_teardowns(stale_after=60) == 1
+
+    db = SessionLocal()
+    try:
+        assert jobs.get_job(db, job_id).status == jobs.COMPLETED
+        assert db.get(models.Organization, organization_id) is None
+    finally:
+        db.close()
+    found, _ = authorization_cache.get(authorization_cache.PRINCIPAL, email)
+    assert not found
+    assert load_principal(email) is None
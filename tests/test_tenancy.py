@@ -0,0 +1,39 @@
+from src.rbac_version_2 import models
+from src.rbac_version_2.database import SessionLocal
+
+
+def _new_user(email, organization_name):
+    return {
+        "first_name": "New", "last_name": "User", "email": email,
+        "password": "chosen-by-admin", "organization_name": organization_name,
+    }
+
+
+def test_admin_creates_user_in_own_organization(client, make_admin):
+    organization_name, headers = make_admin("Alpha")
+    response = client.post(
+        "/api/v1/users/", json=_new_user("member@alpha.example.com", organization_name), headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["email"] == "member@alpha.example.com"
+
+
+def test_admin_cannot_create_user_in_other_organization(client, make_admin):
+    _, headers = make_admin("Bravo")
+    other_name, _ = make_admin("Charlie")
+    response = client.post(
+        "/api/v1/users/", json=_new_user("intruder@charlie.example.com", other_name), headers=headers
+    )
+    assert response.status_code == 404
+
+    response = client.post("/api/v1/users/", json=_new_user("founder@delta.example.com", "Delta"), headers=headers)
+    assert response.status_code == 404
+
+    db = SessionLocal()
+    try:
+        assert db.query(models.User).filter(models.User.email.in_(
+            ["intruder@charlie.example.com", "founder@delta.example.com"]
+        )).count() == 0
+        assert db.query(models.Organization).filter(models.Organization.name == "Delta").count() == 0
+    finally:
+        db.close()
@@ -0,0 +1,15 @@
+import pytest
+
+
+@pytest.mark.parametrize("q", [" ", "   ", "\t"])
+def test_blank_search_query_is_rejected(client, make_admin, q):
+    _, headers = make_admin(f"Foxtrot{len(q)}{ord(q[0])}")
+    response = client.get("/api/v1/users/search", params={"q": q}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_search_finds_users_by_prefix(client, make_admin):
+    _, headers = make_admin("Golf")
+    response = client.get("/api/v1/users/search", params={"q": " admin@golf"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert [user["email"] for user in response.json()["items"]] == ["admin@golf.example.com"]